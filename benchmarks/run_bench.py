@@ -0,0 +1,199 @@
+"""Offline throughput benchmark for the real resolver/sink/pipeline stack.
+
+    python benchmarks/run_bench.py --sizes 1000 10000 100000 --concurrency 1 8 \
+        --latency 0.01 --error-rate 0.0 --throttle-rate 0.01 -o bench.json
+
+Fake Letterboxd and TMDB servers run in this process; every case drives
+MultiResolver -> TMDBSink -> run()/run_async() in a fresh subprocess with an
+empty cache directory, so peak RSS and cache state are per case.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent / "src"))
+
+
+def percentile(xs, q):
+    if not xs:
+        return None
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def write_export(path, size, lb_root):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Date,Name,Year,Letterboxd URI,Rating\n")
+        for n in range(1, size + 1):
+            f.write(f"2024-01-01,Film {n},2000,{lb_root}/film/f{n}/,{(n % 10 + 1) / 2}\n")
+
+
+# ---------- child: one case, real stack, fresh cache dir ----------
+def child(args):
+    import asyncio
+    import resource
+    from curl_cffi import requests
+
+    from tmdb_imp.ratelimit import limiter
+    from tmdb_imp.metrics import metrics
+    from tmdb_imp.store import ResolveStore
+    from tmdb_imp.resolver import MultiResolver, LetterboxdResolver, IMDbResolver
+    from tmdb_imp.tmdb_client import TMDBClient
+    from tmdb_imp.sink import TMDBSink
+    from tmdb_imp.csv_parser import load_event_rows, count_rows
+    from tmdb_imp.events import parse_events
+    from tmdb_imp.pipeline import run, run_async
+
+    concurrency = args.concurrency[0]
+    for host in ("127.0.0.1", "localhost"):
+        limiter.limits[host] = (args.rate, args.rate)
+
+    timings = {"resolve": [], "sink": []}
+
+    def timed(stage, fn):
+        def wrapper(*a, **kw):
+            t = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                timings[stage].append(time.perf_counter() - t)
+        return wrapper
+
+    def atimed(stage, fn):
+        async def wrapper(*a, **kw):
+            t = time.perf_counter()
+            try:
+                return await fn(*a, **kw)
+            finally:
+                timings[stage].append(time.perf_counter() - t)
+        return wrapper
+
+    store = ResolveStore()
+    client = TMDBClient("bench", session_id="bench")
+    resolver = MultiResolver(
+        LetterboxdResolver(requests.Session(), store),
+        IMDbResolver(client, store),
+        lb_hosts=("127.0.0.1",),
+    )
+    sink = TMDBSink(client, None, prefetch=True)
+
+    resolver.resolve = timed("resolve", resolver.resolve)
+    resolver.aresolve = atimed("resolve", resolver.aresolve)
+    sink.apply = timed("sink", sink.apply)
+    sink.aapply = atimed("sink", sink.aapply)
+
+    _, rows = load_event_rows(args.csv)
+    events = parse_events("ratings", rows)
+    total = count_rows(args.csv)
+
+    t = time.perf_counter()
+    if concurrency > 1:
+        asyncio.run(run_async(events, resolver, sink, concurrency=concurrency, total=total))
+    else:
+        run(events, resolver, sink, total=total)
+    wall = time.perf_counter() - t
+
+    errors = Path(".cache/errors.jsonl")
+    result = {
+        "size": args.size,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "events_per_s": round(args.size / wall, 1),
+        "errors": sum(1 for _ in errors.open()) if errors.exists() else 0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    for stage, xs in timings.items():
+        result[f"{stage}_p50_ms"] = round(percentile(xs, 0.50) * 1000, 3) if xs else None
+        result[f"{stage}_p99_ms"] = round(percentile(xs, 0.99) * 1000, 3) if xs else None
+
+    result["metrics"] = metrics.summary()
+    Path(args.out).write_text(json.dumps(result))
+
+
+# ---------- parent: servers, exports, one subprocess per case ----------
+def commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    p.add_argument("--latency", type=float, default=0.0, help="Per-request server latency (s)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    p.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    p.add_argument("--retry-after", type=int, default=1)
+    p.add_argument("--rate", type=float, default=1000.0, help="Rate-limit ceiling per fake host")
+    p.add_argument("-o", "--output", type=Path, help="Write results JSON here as well")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    p.add_argument("--csv", help=argparse.SUPPRESS)
+    p.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    p.add_argument("--out", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child:
+        child(args)
+        return
+
+    from fake_servers import Behaviour, serve, LetterboxdHandler, TMDBHandler
+
+    behaviour = dict(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+    )
+    # separate hostnames so each fake service gets its own rate-limit bucket
+    lb = serve(LetterboxdHandler, Behaviour(**behaviour), "127.0.0.1")
+    tmdb = serve(TMDBHandler, Behaviour(**behaviour), "localhost")
+    lb_root = f"http://127.0.0.1:{lb.server_address[1]}"
+    tmdb_root = f"http://localhost:{tmdb.server_address[1]}"
+
+    results = {"commit": commit(), "params": behaviour, "cases": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            csv_path = Path(tmp) / f"ratings_{size}.csv"
+            write_export(csv_path, size, lb_root)
+
+            for conc in args.concurrency:
+                case_dir = Path(tmp) / f"case_{size}_{conc}"
+                case_dir.mkdir()
+                out = case_dir / "result.json"
+
+                subprocess.run(
+                    [
+                        sys.executable, __file__, "--child",
+                        "--csv", str(csv_path), "--size", str(size),
+                        "--concurrency", str(conc), "--rate", str(args.rate),
+                        "--out", str(out),
+                    ],
+                    cwd=case_dir,
+                    env=dict(os.environ, TMDB_API_ROOT=tmdb_root),
+                    stdout=subprocess.DEVNULL,
+                    check=True,
+                )
+                case = json.loads(out.read_text())
+                results["cases"].append(case)
+                print(json.dumps(case), file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
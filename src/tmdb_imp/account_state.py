@@ -0,0 +1,82 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from .config import PREFETCH_WORKERS
+
+
+class AccountState:
+    def __init__(self):
+        self.watchlist = set()
+        self.favorites = set()
+        self.rated = {}
+        self.list_items = set()
+
+    @classmethod
+    def load(cls, get, account_id, list_id=None):
+        state = cls()
+
+        # (path, media_type, collect(state, media_type, item))
+        sources = []
+        for mt, plural in (("movie", "movies"), ("tv", "tv")):
+            sources += [
+                (f"account/{account_id}/watchlist/{plural}", mt,
+                 lambda s, mt, it: s.watchlist.add((mt, it["id"]))),
+                (f"account/{account_id}/favorite/{plural}", mt,
+                 lambda s, mt, it: s.favorites.add((mt, it["id"]))),
+                (f"account/{account_id}/rated/{plural}", mt,
+                 lambda s, mt, it: s.rated.__setitem__((mt, it["id"]), it.get("rating"))),
+            ]
+        if list_id:
+            sources.append(cls._list_source(list_id))
+
+        cls._fetch(state, get, sources)
+        return state
+
+    def for_list(self, get, list_id):
+        # same account sets, different target list
+        other = copy.copy(self)
+        other.list_items = set()
+        if list_id:
+            self._fetch(other, get, [self._list_source(list_id)])
+        return other
+
+    @staticmethod
+    def _list_source(list_id):
+        return (
+            f"list/{list_id}", None,
+            lambda s, mt, it: s.list_items.add((it.get("media_type") or "movie", it["id"])),
+        )
+
+    @staticmethod
+    def _fetch(state, get, sources):
+        def fetch(path, page):
+            return get(path, page=page)
+
+        with ThreadPoolExecutor(PREFETCH_WORKERS) as pool:
+            # first pages in parallel tell us how many more to fetch per source
+            firsts = list(pool.map(lambda src: fetch(src[0], 1), sources))
+
+            rest = [
+                (src, pool.submit(fetch, src[0], page))
+                for src, first in zip(sources, firsts)
+                for page in range(2, (first.get("total_pages") or 1) + 1)
+            ]
+            pages = list(zip(sources, firsts)) + [(src, f.result()) for src, f in rest]
+
+        for (path, mt, collect), data in pages:
+            for item in data.get("results") or data.get("items") or []:
+                collect(state, mt, item)
+
+    # ---- what a successful write leaves behind ----
+    def mark(self, ev):
+        key = (ev.media_type, ev.tmdb_id)
+        rating = (ev.payload or {}).get("rating")
+
+        if ev.kind in {"list", "watched"}:
+            self.list_items.add(key)
+        elif ev.kind == "watchlist":
+            self.watchlist.add(key)
+        elif ev.kind == "like":
+            self.favorites.add(key)
+
+        if ev.kind in {"list", "rating"} and rating is not None:
+            self.rated[key] = float(rating)
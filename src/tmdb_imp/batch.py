@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import argparse
+from pathlib import Path
+from .config import DEFAULT_COOKIE_JAR
+from .cli import MODES
+
+ACCOUNT_NAME = re.compile(r"^[\w.-]+$")  # also the account's directory name
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="tmdb-imp batch",
+        description="Sync the exports of several TMDB accounts listed in a manifest, "
+                    "sharing one resolution cache and one rate budget.",
+    )
+    p.add_argument("manifest", type=Path, help="JSON manifest of accounts")
+    p.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Only sync this account (repeatable)",
+    )
+    p.add_argument(
+        "--cookies",
+        type=Path,
+        default=None,
+        help="Letterboxd cookie jar used to resolve film pages "
+             "(default: the manifest's, else lb_cookies.json)",
+    )
+    p.add_argument("--dry-run", action="store_true", help="Resolve and cache only; do not mutate TMDB")
+    p.add_argument("--no-resume", action="store_true", help="Ignore progress and reprocess everything")
+    p.add_argument("--concurrency", type=int, default=1, help="Events per account at once (default: 1)")
+    p.add_argument("--sink-workers", type=int, default=0, help="See `tmdb-imp --help` (default: 0)")
+    p.add_argument("--queue-size", type=int, default=64, help="See `tmdb-imp --help` (default: 64)")
+    p.add_argument("--incremental", action="store_true", help="Only rows changed since the last run")
+    p.add_argument("--coalesce", action="store_true", help="Write once per film and event kind")
+    p.add_argument("--report", type=Path, help="Write a JSON run report to this path")
+    p.add_argument("--prom", type=Path, help="Write run metrics as a Prometheus textfile")
+    return p
+
+
+# ---------- manifest ----------
+def load_manifest(path):
+    # {"cookies": "lb_cookies.json",
+    #  "accounts": [{"name": "alice", "mode": "export", "csv": "alice.zip",
+    #                "session_id": "..." | "session_file": "...", "api_key": "...", "title": "..."}]}
+    # relative paths are relative to the manifest
+    data = json.loads(path.read_text(encoding="utf-8"))
+    base = path.parent
+
+    accounts, names = [], set()
+    for i, acc in enumerate(data.get("accounts") or []):
+        name = acc.get("name")
+        if not name or not ACCOUNT_NAME.match(name):
+            raise ValueError(f"account #{i + 1}: name must match {ACCOUNT_NAME.pattern}")
+        if name in names:
+            raise ValueError(f"account {name!r} is listed twice")
+        if acc.get("mode") not in MODES:
+            raise ValueError(f"account {name!r}: mode must be one of {', '.join(MODES)}")
+        if not acc.get("csv"):
+            raise ValueError(f"account {name!r}: csv is required")
+        if not acc.get("session_id") and not acc.get("session_file"):
+            raise ValueError(f"account {name!r}: session_id or session_file is required")
+
+        acc = dict(acc, csv=base / acc["csv"])
+        if acc.get("session_file"):
+            acc["session_file"] = base / acc["session_file"]
+        names.add(name)
+        accounts.append(acc)
+
+    if not accounts:
+        raise ValueError(f"{path} lists no accounts")
+
+    cookies = base / data["cookies"] if data.get("cookies") else DEFAULT_COOKIE_JAR
+    return accounts, cookies
+
+
+def account_client(acc, api_key):
+    from .tmdb_client import TMDBClient
+
+    client = TMDBClient(
+        acc.get("api_key") or api_key,
+        v4_token=acc.get("v4_token") or os.environ.get("TMDB_V4_ACCESS_TOKEN"),
+    )
+    if acc.get("session_id"):
+        client.session_id = acc["session_id"]
+    else:
+        client.session_id = acc["session_file"].read_text().strip()
+    return client
+
+
+def lookup_client(api_key, accounts):
+    # IMDb Find lookups need an API key but no session, so the resolver shared by all
+    # accounts runs them under TMDB_API_KEY rather than whichever account went first
+    from .tmdb_client import TMDBClient
+
+    if api_key:
+        return TMDBClient(api_key)
+    acc = accounts[0]
+    print(f"[INFO] TMDB_API_KEY is not set: IMDb lookups use {acc['name']}'s API key")
+    return TMDBClient(acc["api_key"])
+
+
+def account_args(args, acc):
+    # the import options of one account: the batch flags plus its manifest entry
+    return argparse.Namespace(**dict(
+        vars(args),
+        mode=acc["mode"],
+        csv=acc["csv"],
+        title=acc.get("title"),
+    ))
+
+
+def main(argv=None):
+    from .cli import build_resolver, sync_streams, write_reports
+    from .workspace import Workspace
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        accounts, cookies = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(f"bad manifest: {e}")
+    args.cookies = args.cookies or cookies
+
+    if args.only:
+        unknown = set(args.only) - {acc["name"] for acc in accounts}
+        if unknown:
+            parser.error(f"not in the manifest: {', '.join(sorted(unknown))}")
+        accounts = [acc for acc in accounts if acc["name"] in args.only]
+
+    api_key = os.environ.get("TMDB_API_KEY")
+    if not api_key and not all(acc.get("api_key") for acc in accounts):
+        parser.error("TMDB_API_KEY environment variable must be set")
+
+    # one resolver (and so one resolution cache and Letterboxd login) for every
+    # account; the rate limiter is per process, so all accounts share its budget
+    resolver = None
+    failed = []
+    try:
+        for acc in accounts:
+            print(f"[BATCH] {acc['name']}: {acc['mode']} {acc['csv']}")
+            try:
+                client = account_client(acc, api_key)
+                resolver = resolver or build_resolver(args, lookup_client(api_key, accounts))
+                sync_streams(account_args(args, acc), client, resolver, Workspace.for_account(acc["name"]))
+            except Exception as e:
+                # one account's bad export or expired session must not stop the others
+                print(f"[ERROR] {acc['name']}: {e}")
+                failed.append(acc["name"])
+    finally:
+        write_reports(args)
+
+    print(f"[BATCH] {len(accounts) - len(failed)} of {len(accounts)} accounts synced")
+    if failed:
+        raise SystemExit(f"[ERROR] failed accounts: {', '.join(failed)}")
@@ -0,0 +1,73 @@
+import json
+import argparse
+from pathlib import Path
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="tmdb-imp cache",
+        description="Inspect, maintain and share the resolution cache.",
+    )
+    sub = p.add_subparsers(dest="action", required=True)
+
+    sub.add_parser("stats", help="Row counts, staleness and age distribution per status")
+
+    prune = sub.add_parser("prune", help="Evict rows past their TTL")
+    prune.add_argument(
+        "--ttl",
+        action="append",
+        default=[],
+        metavar="STATUS=DAYS",
+        help="Override the TTL for one status (repeatable), e.g. not_found=3",
+    )
+    prune.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be evicted",
+    )
+
+    export = sub.add_parser("export", help="Write resolutions and list IDs to a snapshot file")
+    export.add_argument("snapshot", type=Path, help="Snapshot to write (gzip JSON lines)")
+
+    imp = sub.add_parser("import", help="Merge one or more snapshots into the local cache")
+    imp.add_argument("snapshots", type=Path, nargs="+", help="Snapshots to merge, in order")
+
+    return p
+
+
+def parse_ttl(pairs, parser):
+    from .config import CACHE_TTL, DAY
+    ttl = dict(CACHE_TTL)
+    for pair in pairs:
+        status, _, days = pair.partition("=")
+        try:
+            ttl[status] = float(days) * DAY
+        except ValueError:
+            parser.error(f"--ttl expects STATUS=DAYS, got {pair!r}")
+    return ttl
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    from .store import ResolveStore
+    store = ResolveStore()
+
+    if args.action == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    elif args.action == "prune":
+        removed = store.prune(parse_ttl(args.ttl, parser), dry_run=args.dry_run)
+        verb = "Would evict" if args.dry_run else "Evicted"
+        print(f"[INFO] {verb} {sum(removed.values())} rows {json.dumps(removed)}")
+    elif args.action == "export":
+        from .snapshot import export_snapshot
+        counts = export_snapshot(store, args.snapshot)
+        print(f"[INFO] Wrote {args.snapshot} {json.dumps(counts)}")
+    elif args.action == "import":
+        from .snapshot import import_snapshot
+        for path in args.snapshots:
+            counts = import_snapshot(store, path)
+            print(f"[INFO] Merged {path} {json.dumps(counts)}")
+
+    store.close()
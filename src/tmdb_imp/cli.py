@@ -1,17 +1,16 @@
 import os
+import sys
 import argparse
 from pathlib import Path
-import tmdbsimple as tmdb
-
-from .lb_session import ensure_lb_session
-from .tmdb_session import ensure_tmdb_session
-from .resolver import LetterboxdResolver, IMDbResolver, MultiResolver
-from .csv_parser import load_event_rows
-from .events import parse_events
-from .sink import TMDBSink
-from .pipeline import run
+
 from .config import DEFAULT_COOKIE_JAR
 
+# Everything heavier (curl_cffi, asyncio, sqlite, the pipeline) is imported where it
+# is used, so `--help`, dry runs and fully cached resumes only load what they touch.
+
+MODES = ["watchlist", "likes", "ratings", "reviews", "list", "imdb-list", "export"]
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
         prog="lb_sync",
@@ -20,14 +19,14 @@ def build_parser() -> argparse.ArgumentParser:
 
     p.add_argument(
         "mode",
-        choices=["watchlist", "likes", "ratings", "reviews", "list", "imdb-list"],
-        help="Type of Letterboxd export being imported",
+        choices=MODES,
+        help="Type of Letterboxd export being imported (export: the full account ZIP)",
     )
 
     p.add_argument(
         "csv",
         type=Path,
-        help="Path to Letterboxd CSV export",
+        help="Path to Letterboxd CSV export (or export ZIP in export mode)",
     )
 
     p.add_argument(
@@ -49,24 +48,208 @@ def build_parser() -> argparse.ArgumentParser:
         help="Ignore progress cache and reprocess everything",
     )
 
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only import rows added or changed since the last incremental run "
+             "(with --no-resume: all rows, refreshing the fingerprint)",
+    )
+
     p.add_argument("--title", help="Title for created TMDB list")
 
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Resolve and apply up to N events at once (default: 1, sequential)",
+    )
+
+    p.add_argument(
+        "--sink-workers",
+        type=int,
+        default=0,
+        help="Run resolution and TMDB writes as separate stages: --concurrency resolvers "
+             "feed N writers through a bounded queue (default: 0, not staged)",
+    )
+
+    p.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="Resolved events the staged pipeline buffers between its stages (default: 64)",
+    )
+
+    p.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Resolve the whole file first, then write once per film and event kind: "
+             "the latest rating by date, one watchlist/favorite/list add",
+    )
+
+    p.add_argument(
+        "--report",
+        type=Path,
+        help="Write a JSON run report (latencies, cache hits, retries) to this path",
+    )
+
+    p.add_argument(
+        "--prom",
+        type=Path,
+        help="Write run metrics as a Prometheus textfile to this path",
+    )
+
     return p
 
 
-def main():
+def write_reports(args):
+    from .metrics import metrics
+    if args.report:
+        metrics.write_json(args.report)
+    if args.prom:
+        metrics.write_prometheus(args.prom)
+
+
+def cache_command(argv):
+    from .cache_cli import main
+    main(argv)
+
+
+def plan_command(argv):
+    from .plan import plan_main
+    plan_main(argv)
+
+
+def apply_command(argv):
+    from .plan import apply_main
+    apply_main(argv)
+
+
+def retry_command(argv):
+    from .retry import main
+    main(argv)
+
+
+def batch_command(argv):
+    from .batch import main
+    main(argv)
+
+
+def serve_command(argv):
+    from .serve import main
+    main(argv)
+
+
+def index_command(argv):
+    from .index_cli import main
+    main(argv)
+
+
+# subcommands, dispatched before the import parser sees argv
+COMMANDS = {
+    "cache": cache_command,
+    "plan": plan_command,
+    "apply": apply_command,
+    "retry": retry_command,
+    "batch": batch_command,
+    "serve": serve_command,
+    "index": index_command,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+
     parser = build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    # Sessions, shared by every file of the run. Letterboxd is only logged into
+    # once a page actually has to be fetched; dry runs never need a TMDB session.
+    client = tmdb_client(parser, session=not args.dry_run)
+    resolver = build_resolver(args, client)
+
+    try:
+        sync_streams(args, client, resolver)
+    finally:
+        write_reports(args)
+
+
+def sync_streams(args, client, resolver, ws=None):
+    # every file of args.csv into the account behind `client`, keeping state in `ws`
+    from .events import parse_events
+    from .workspace import DEFAULT_WORKSPACE
+
+    ws = ws or DEFAULT_WORKSPACE
+    sink = None
+    for name, mode, list_meta, rows, total in open_streams(args):
+        if args.mode == "export":
+            print(f"[INFO] {name}: {mode}")
 
-    tmdb.API_KEY = os.environ.get("TMDB_API_KEY")
-    if not tmdb.API_KEY:
+        target = None
+        if not args.dry_run:
+            sink, target = target_sink(sink, client, list_meta, **ws.sink_kwargs())
+
+        if args.incremental:
+            incremental(args, name, mode, list_meta, rows, resolver, target, ws)
+        else:
+            execute(args, parse_events(mode, rows), resolver, target, total, ws.journal(list_meta))
+
+
+def tmdb_client(parser, session=True):
+    api_key = os.environ.get("TMDB_API_KEY")
+    if not api_key:
         parser.error("TMDB_API_KEY environment variable must be set")
 
-    # Sessions
-    lb_session = ensure_lb_session(args.cookies)
-    tmdb_session_id = ensure_tmdb_session()
+    from .tmdb_client import TMDBClient
+    client = TMDBClient(api_key, v4_token=os.environ.get("TMDB_V4_ACCESS_TOKEN"))
+    if session:
+        from .tmdb_session import ensure_tmdb_session
+        client.session_id = ensure_tmdb_session(client)
+    return client
+
+
+def build_resolver(args, client, store=None, connect=None):
+    # `store` and `connect` let long-lived callers share one cache and Letterboxd login
+    from .config import IMDB_INDEX
+    from .imdb_index import IMDbIndex
+    from .lb_session import ensure_lb_session
+    from .resolver import LetterboxdResolver, IMDbResolver, MultiResolver
+    from .store import ResolveStore
+
+    # a broken index only costs the API calls it would have saved
+    try:
+        index = IMDbIndex.load(IMDB_INDEX)
+    except ValueError as e:
+        print(f"[WARN] Ignoring the IMDb index: {e}")
+        index = None
+
+    store = store or ResolveStore()
+    return MultiResolver(
+        LetterboxdResolver(None, store, connect=connect or (lambda: ensure_lb_session(args.cookies))),
+        IMDbResolver(client, store, index),
+    )
+
+
+def target_sink(base, client, list_meta, **kwargs):
+    # one TMDBSink per run; further target lists reuse its account and prefetched state
+    if base is None:
+        from .sink import TMDBSink
+        base = TMDBSink(client, list_meta, prefetch=True, **kwargs)
+        return base, base
+    return base, base.for_list(list_meta)
+
+
+def open_streams(args):
+    if args.mode == "export":
+        from .export_zip import export_streams
+        return export_streams(args.csv)
+    return [single_stream(args)]
+
+
+def single_stream(args):
+    from .csv_parser import load_event_rows, count_rows
 
-    # Load CSV
     list_meta, rows = load_event_rows(
         args.csv,
         is_list=(args.mode == "list"),
@@ -97,23 +280,90 @@ def main():
     if args.mode == "list" and not list_meta:
         raise RuntimeError("List mode but no list metadata found")
 
-    resolver = MultiResolver(
-        LetterboxdResolver(lb_session),
-        IMDbResolver(tmdb.API_KEY),
-    )
-
-    sink = TMDBSink(
-        tmdb_session_id,
+    total = count_rows(args.csv, is_list=(args.mode == "list"))
+    return (
+        args.csv.name,
+        args.mode,
         list_meta if args.mode in {"list", "imdb-list", "watched"} else None,
+        rows,
+        total,
     )
 
-    events = parse_events(args.mode, rows)
+
+def incremental(args, name, mode, list_meta, rows, resolver, sink, ws):
+    # diff the file against the fingerprint of the last run and import only the delta;
+    # rows count as imported once their event is done, so failures come back next time
+    from .events import parse_events
+    from .pipeline import collect, event_id
+    from .sync import Fingerprint
+
+    fp = Fingerprint(mode, list_meta, ws.sync_dir).diff(rows, full=args.no_resume)
+    print(f"[SYNC] {name}: " + ", ".join(f"{n} {s}" for s, n in fp.counts.items()))
+    if fp.counts["removed"]:
+        print(f"[WARN] {name}: {fp.counts['removed']} rows gone since the last run are not removed from TMDB")
+
+    events, journal = [], ws.journal(list_meta)
+    execute(args, collect(parse_events(mode, fp.rows()), events), resolver, sink, len(fp.delta), journal)
+
+    if not args.dry_run:
+        fp.save(journal.is_done(event_id(ev), ev) for ev in events)
+
+
+def execute(args, events, resolver, sink, total, journal=None, list_meta=None):
+    from .progress import ProgressJournal
+
+    journal = journal or ProgressJournal(target=list_meta)
+
+    if getattr(args, "coalesce", False) and not args.dry_run:
+        # every winner is resolved by now, and the first pass closed the resolver
+        from .coalesce import coalesced
+        events, total = coalesced(events, journal, lambda seen: dispatch(
+            args, seen, resolver, None, total, journal, dry_run=True,
+        ))
+        resolver = None
+
+    dispatch(args, events, resolver, sink, total, journal, args.dry_run)
+
+
+def dispatch(args, events, resolver, sink, total, journal, dry_run):
+    from .pipeline import run, run_async, run_staged
+
+    if args.sink_workers > 0:
+        import asyncio
+        asyncio.run(run_staged(
+            events=events,
+            resolver=resolver,
+            sink=sink,
+            dry_run=dry_run,
+            resume=not args.no_resume,
+            resolve_workers=args.concurrency,
+            sink_workers=args.sink_workers,
+            queue_size=args.queue_size,
+            journal=journal,
+            total=total,
+        ))
+        return
+
+    if args.concurrency > 1:
+        import asyncio
+        asyncio.run(run_async(
+            events=events,
+            resolver=resolver,
+            sink=sink,
+            dry_run=dry_run,
+            resume=not args.no_resume,
+            concurrency=args.concurrency,
+            journal=journal,
+            total=total,
+        ))
+        return
 
     run(
         events=events,
         resolver=resolver,
         sink=sink,
-        dry_run=args.dry_run,
+        dry_run=dry_run,
         resume=not args.no_resume,
+        journal=journal,
+        total=total,
     )
-
@@ -0,0 +1,57 @@
+def op_key(ev):
+    # one write per event kind and film: a list add never stands in for a rating,
+    # nor a watched add for a list add
+    return ev.kind, ev.media_type, ev.tmdb_id
+
+
+def _rating(ev):
+    return (ev.payload or {}).get("rating")
+
+
+def _supersedes(ev, best):
+    # events that carry a rating (ratings, rated imdb-list rows) keep the latest one by
+    # date, the later row on a tie; anything else keeps its first occurrence
+    if _rating(ev) is None:
+        return False
+    return _rating(best) is None or (ev.date or "") >= (best.date or "")
+
+
+def coalesce(events):
+    # resolved events in input order -> (one winner per op_key in input order, the rest).
+    # Watchlist, favorite and list adds keep their first occurrence, so list positions
+    # stay where they were.
+    winners = {}
+    dropped = []
+    for i, ev in enumerate(events):
+        key = op_key(ev)
+        best = winners.get(key)
+        if best is None:
+            winners[key] = (i, ev)
+        elif _supersedes(ev, best[1]):
+            dropped.append(best[1])
+            winners[key] = (i, ev)
+        else:
+            dropped.append(ev)
+
+    return [ev for _, ev in sorted(winners.values(), key=lambda w: w[0])], dropped
+
+
+def coalesced(events, journal, resolve):
+    # resolve everything first (`resolve` runs a dry pass over the events it is given),
+    # then only hand the sink one write per op_key; the repeats are recorded as done
+    # without touching TMDB. Returns (winners, how many).
+    from .metrics import metrics
+    from .pipeline import collect, event_id
+
+    seen = []
+    resolve(collect(events, seen))
+    winners, dropped = coalesce(ev for ev in seen if ev.tmdb_id)
+
+    journal.load()
+    for ev in dropped:
+        metrics.inc("events_total", outcome="coalesced")
+        journal.record_success(event_id(ev), ev)
+    journal.flush()
+
+    print(f"[INFO] Coalesced {len(dropped)} repeated events; {len(winners)} writes left")
+    return iter(winners), len(winners)
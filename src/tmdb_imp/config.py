@@ -1,14 +1,63 @@
+import os
 from pathlib import Path
 
-REQUEST_DELAY = 0.5
+# service endpoints; overridable so benchmarks can point at local stand-ins
+TMDB_API_ROOT = os.environ.get("TMDB_API_ROOT", "https://api.themoviedb.org")
+LETTERBOXD_HOSTS = ("boxd.it", "letterboxd.com")
 
-CACHE_DIR = Path(".cache")
-CACHE_DIR.mkdir(exist_ok=True)
+# host -> (initial req/s, ceiling req/s); buckets adapt between MIN_RATE and the ceiling
+RATE_LIMITS = {
+    "letterboxd.com": (2.0, 8.0),
+    "api.themoviedb.org": (20.0, 40.0),
+    "default": (2.0, 8.0),
+}
+RATE_HOST_ALIASES = {"boxd.it": "letterboxd.com"}
+MIN_RATE = 0.2
+MAX_RETRIES = 5
+MAX_RETRY_AFTER = 300.0  # longest Retry-After honoured, in seconds
 
-RESOLVE_CACHE = CACHE_DIR / "resolve_cache.json"
+# shared TMDB connection pool: requests in flight at once, sync and async alike,
+# and per-request timeout (s)
+TMDB_POOL_SIZE = 10
+TMDB_TIMEOUT = 30
+
+# relative to the working directory unless pointed elsewhere (e.g. a mounted volume)
+CACHE_DIR = Path(os.environ.get("TMDB_IMP_CACHE_DIR", ".cache"))  # created on first write
+
+RESOLVE_CACHE = CACHE_DIR / "resolve_cache.json"  # legacy, migrated into RESOLVE_DB
+RESOLVE_DB = CACHE_DIR / "resolve_cache.sqlite3"
+IMDB_INDEX = CACHE_DIR / "imdb_index.bin"  # built by `tmdb-imp index build`
+STORE_COMMIT_EVERY = 100
+STORE_COMMIT_INTERVAL = 5.0
+# seconds a cached resolution is trusted before it is refetched on next use
+DAY = 86400
+CACHE_TTL = {
+    "found": 365 * DAY,
+    "not_found": 14 * DAY,
+    "blocked": DAY,
+    "error": 7 * DAY,  # only used by `cache prune`; errors are retried per ERROR_BACKOFF_*
+}
+# failed lookups wait BASE * 2**(fails-1) seconds, capped at MAX, before the next try
+ERROR_BACKOFF_BASE = 300
+ERROR_BACKOFF_MAX = 7 * DAY
 PROGRESS_LOG = CACHE_DIR / "progress.jsonl"
+PROGRESS_INDEX = CACHE_DIR / "progress.idx"
+JOURNAL_FLUSH_EVERY = 200
+JOURNAL_FLUSH_INTERVAL = 2.0
+JOURNAL_COMPACT_EVERY = 50_000
 ERROR_LOG = CACHE_DIR / "errors.jsonl"
 LIST_CACHE = CACHE_DIR / "tmdb_lists.json"
+SYNC_DIR = CACHE_DIR / "sync"  # row fingerprints of past imports, for --incremental
+ACCOUNTS_DIR = CACHE_DIR / "accounts"  # per-account state of `batch` runs
+JOBS_DIR = CACHE_DIR / "jobs"  # uploads waiting for a `serve` worker
+SERVE_MAX_UPLOAD = 256 << 20
+SERVE_KEEP_JOBS = 500  # finished jobs still reported by `serve`
+EXPORT_BUFFER_MAX = 16 << 20  # export ZIP files up to this size are read whole, for a total
+SNAPSHOT_VERSION = 1
+PLAN_VERSION = 1
+LIST_BATCH_SIZE = 100
+PREFETCH_WORKERS = TMDB_POOL_SIZE
 
 DEFAULT_COOKIE_JAR = Path("lb_cookies.json")
 TMDB_SESSION_FILE = Path("tmdb_session.txt")
+TMDB_ACCOUNT_FILE = Path("tmdb_account.json")  # account bootstrap, keyed by a session hash
@@ -1,25 +1,63 @@
 import csv
 from .models import LBListMeta
 
+LIST_HEADER_ROWS = 5
+LIST_MARKER = "Letterboxd list export"
+
 
 def load_event_rows(path, is_list=False):
-    with open(path, newline="", encoding="utf-8") as f:
+    return read_event_rows(open(path, newline="", encoding="utf-8"), is_list)
+
+
+def read_event_rows(f, is_list=False):
+    # rows are streamed: `f` stays open until the returned iterator is exhausted
+    try:
         if is_list:
-            rows = list(csv.reader(f))
-            meta, data = strip_header(rows)
-            return meta, data
-        else:
-            return None, list(csv.DictReader(f))
+            reader = csv.reader(f)
+            meta, header = read_list_header(reader)
+            if meta is None:
+                f.close()
+                return None, iter(())
+            return meta, _stream(f, (dict(zip(header, r)) for r in reader))
+        return None, _stream(f, csv.DictReader(f))
+    except Exception:
+        f.close()
+        raise
+
+
+def _stream(f, rows):
+    with f:
+        yield from rows
+
 
+def count_rows(path, is_list=False):
+    with open(path, "rb") as f:
+        return count_lines(f, is_list)
+
+
+def count_lines(f, is_list=False):
+    # byte-level newline count: cheap, but quoted newlines inside a field
+    # make it an upper bound rather than an exact total
+    n = 0
+    for block in iter(lambda: f.read(1 << 20), b""):
+        n += block.count(b"\n")
+    return max(0, n - (LIST_HEADER_ROWS if is_list else 1))
+
+
+def read_list_header(reader):
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) == LIST_HEADER_ROWS:
+            break
 
-def strip_header(rows):
     if not rows:
         return None, []
 
-    if not rows[0][0].startswith("Letterboxd list export"):
+    if not rows[0][0].lstrip("\ufeff").startswith(LIST_MARKER):
         raise ValueError("Not a Letterboxd list export")
 
-    if len(rows) < 6:
+    if len(rows) < LIST_HEADER_ROWS:
         raise ValueError("List export is too short to parse")
 
     meta_row = rows[2]
@@ -32,6 +70,4 @@ def strip_header(rows):
     )
 
     header = [h.strip() for h in rows[4]]
-    data_rows = rows[5:]
-
-    return meta, [dict(zip(header, r)) for r in data_rows]
+    return meta, header
@@ -0,0 +1,54 @@
+import io
+import zipfile
+from .csv_parser import read_event_rows, count_lines, LIST_MARKER
+from .config import EXPORT_BUFFER_MAX
+
+# files of a Letterboxd account export that map onto an import mode;
+# anything else is only imported if its header marks it as a list export
+EXPORT_FILES = {
+    "ratings.csv": "ratings",
+    "likes/films.csv": "likes",
+    "watchlist.csv": "watchlist",
+}
+SKIP_DIRS = ("deleted/", "orphaned/")
+
+
+def infer_mode(z, name):
+    if name.startswith(SKIP_DIRS) or not name.endswith(".csv"):
+        return None
+    if name in EXPORT_FILES:
+        return EXPORT_FILES[name]
+
+    with z.open(name) as f:
+        first = f.readline().decode("utf-8", errors="replace").lstrip("\ufeff")
+    return "list" if first.startswith(LIST_MARKER) else None
+
+
+def export_streams(path):
+    # yields (name, mode, list_meta, rows, total) for every importable file,
+    # reading straight from the archive without extracting it
+    with zipfile.ZipFile(path) as z:
+        names = [n for n in z.namelist() if not n.endswith("/")]
+        ordered = [n for n in EXPORT_FILES if n in names]
+        ordered += sorted(n for n in names if n not in EXPORT_FILES)
+
+        for name in ordered:
+            mode = infer_mode(z, name)
+            if mode is None:
+                continue
+
+            # inflate each file once: a file of ordinary size is read into memory so its
+            # rows can be counted; a bigger one is streamed with its total left unknown
+            is_list = mode == "list"
+            if z.getinfo(name).file_size <= EXPORT_BUFFER_MAX:
+                raw = io.BytesIO(z.read(name))
+                total = count_lines(raw, is_list)
+                raw.seek(0)
+            else:
+                total, raw = None, z.open(name)
+
+            f = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            meta, rows = read_event_rows(f, is_list)
+            if is_list and meta is None:
+                continue
+            yield name, mode, meta, rows, total
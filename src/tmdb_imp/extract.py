@@ -0,0 +1,93 @@
+import re
+
+# <p class="text-link text-footer"> ... <a href="https://www.themoviedb.org/movie/348/"> ... </p>
+FOOTER_OPEN = re.compile(
+    rb'<p\s[^>]*class="(?=[^"]*\btext-link\b)(?=[^"]*\btext-footer\b)[^"]*"[^>]*>'
+)
+FOOTER_CLOSE = b"</p>"
+TMDB_LINK = re.compile(rb'href="[^"]*themoviedb\.org/(movie|tv)/(\d+)')
+IMDB_LINK = re.compile(rb'href="[^"]*imdb\.com/title/(tt\d+)')
+
+# how far back to rescan when a tag straddles two chunks
+OVERLAP = 512
+
+
+class FooterScanner:
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0
+        self.start = None
+        self.footer = None
+
+    def feed(self, chunk: bytes) -> bool:
+        self.buf += chunk
+
+        if self.start is None:
+            m = FOOTER_OPEN.search(self.buf, max(0, self.pos - OVERLAP))
+            self.pos = len(self.buf)
+            if not m:
+                return False
+            self.start = m.end()
+
+        end = self.buf.find(FOOTER_CLOSE, self.start)
+        if end < 0:
+            return False
+
+        self.footer = bytes(self.buf[self.start:end])
+        return True
+
+    def tmdb_link(self):
+        m = TMDB_LINK.search(self.footer or b"")
+        return (m.group(1).decode(), int(m.group(2))) if m else None
+
+    def imdb_id(self):
+        m = IMDB_LINK.search(self.footer or b"")
+        return m.group(1).decode() if m else None
+
+    def text(self) -> str:
+        return self.buf.decode("utf-8", errors="replace")
+
+
+def scan(chunks) -> FooterScanner:
+    s = FooterScanner()
+    for chunk in chunks:
+        if s.feed(chunk):
+            break
+    return s
+
+
+async def ascan(chunks) -> FooterScanner:
+    s = FooterScanner()
+    async for chunk in chunks:
+        if s.feed(chunk):
+            break
+    return s
+
+
+# ---- slow path: a real HTML parse, used only when the scanner comes up empty ----
+def tmdb_link_from_html(html: str, footer_only=False):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+
+    footer = soup if footer_only else soup.select_one("p.text-link.text-footer")
+    if not footer:
+        return None
+
+    for a in footer.find_all("a", href=True):
+        if "themoviedb.org" in a["href"]:
+            m = re.search(r"/(movie|tv)/(\d+)", a["href"])
+            if m:
+                return m.group(1), int(m.group(2))
+
+    return None
+
+
+def tmdb_link(page: FooterScanner):
+    if page.footer is None:
+        return tmdb_link_from_html(page.text())
+
+    link = page.tmdb_link()
+    if link is None and b"themoviedb" in page.footer:
+        # unusual markup inside the footer: parse just that fragment
+        link = tmdb_link_from_html(page.footer.decode("utf-8", errors="replace"), footer_only=True)
+    return link
@@ -0,0 +1,27 @@
+import re
+from urllib.parse import urlsplit, urlunsplit
+from .config import LETTERBOXD_HOSTS
+
+# /film/<slug>/..., /<user>/film/<slug>/... (reviews, diary entries, activity)
+FILM_PATH = re.compile(r"^(?:/[^/]+)?/film/([^/]+)")
+
+
+def canonical_url(url, hosts=LETTERBOXD_HOSTS):
+    # one spelling per film page: https, bare host, /film/<slug>, no trailing slash.
+    # boxd.it short links keep their (case-sensitive) code; they only map onto a
+    # film page once a fetch has followed the redirect
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    scheme = "https" if host in hosts else (parts.scheme or "https").lower()
+
+    path = parts.path
+    m = FILM_PATH.match(path)
+    if m:
+        path = f"/film/{m.group(1).lower()}"
+
+    return urlunsplit((scheme, host, path.rstrip("/"), "", ""))
@@ -0,0 +1,128 @@
+import csv
+import json
+import mmap
+import struct
+
+# sorted fixed-size records behind a small header: numeric tt id, TMDB id, media type.
+# Lookups binary-search the memory-mapped file, so opening it costs nothing and
+# only the pages a search touches are ever read.
+MAGIC = b"TMDBIMDB"
+HEADER = struct.Struct("<8sII")  # magic, version, record count
+RECORD = struct.Struct("<IIB")
+INDEX_VERSION = 1
+MEDIA_TYPES = ("movie", "tv")
+
+
+def tt_number(imdb_id):
+    # "tt0111161" -> 111161; None for anything that is not a title id
+    if not imdb_id.startswith("tt") or not imdb_id[2:].isdigit():
+        return None
+    n = int(imdb_id[2:])
+    return n if n < 1 << 32 else None
+
+
+# ---------- reading ----------
+class IMDbIndex:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.f.close()
+            raise ValueError(f"{path} is not an IMDb index")
+
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not an IMDb index")
+        magic, version, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an IMDb index")
+        if version > INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{path} is index version {version}; this tmdb-imp reads up to {INDEX_VERSION}")
+        if len(self.map) < HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is truncated; rebuild it with `tmdb-imp index build`")
+
+    @classmethod
+    def load(cls, path):
+        # None when no index was built, so callers can skip it cheaply
+        return cls(path) if path.exists() else None
+
+    def __len__(self):
+        return self.count
+
+    def get(self, imdb_id):
+        n = tt_number(imdb_id)
+        if n is None:
+            return None
+
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            tt, tmdb_id, media = RECORD.unpack_from(self.map, HEADER.size + mid * RECORD.size)
+            if tt < n:
+                lo = mid + 1
+            elif tt > n:
+                hi = mid
+            else:
+                return tmdb_id, MEDIA_TYPES[media]
+        return None
+
+    def close(self):
+        self.map.close()
+        self.f.close()
+
+
+# ---------- building ----------
+def read_dump(path):
+    # (imdb_id, tmdb_id, media_type) rows from JSON lines or a CSV/TSV with those
+    # columns (header optional); cache snapshots are JSON lines of another shape
+    with open(path, encoding="utf-8", newline="") as f:
+        first = f.readline()
+        f.seek(0)
+        if first.lstrip().startswith("{"):
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    yield rec.get("imdb_id"), rec.get("tmdb_id"), rec.get("media_type")
+            return
+
+        reader = csv.reader(f, delimiter="\t" if "\t" in first else ",")
+        for row in reader:
+            if len(row) >= 3 and row[0] != "imdb_id":
+                yield row[0].strip(), row[1].strip(), row[2].strip()
+
+
+def cache_rows(store):
+    # IMDb titles the resolver cache already knows, from past imdb-list runs and
+    # from Letterboxd pages (which name the IMDb title of every film)
+    rows, _ = store.dump()
+    for key, status, tmdb_id, media_type, _ts in rows:
+        if status == "found" and key.startswith("tt"):
+            yield key, tmdb_id, media_type
+
+
+def build_index(rows, path):
+    # later rows win for a repeated tt id; returns (records written, rows skipped)
+    entries, skipped = {}, 0
+    for imdb_id, tmdb_id, media_type in rows:
+        n = tt_number(str(imdb_id or ""))
+        try:
+            tmdb_id = int(tmdb_id)
+        except (TypeError, ValueError):
+            tmdb_id = -1
+        if n is None or not 0 < tmdb_id < 1 << 32 or media_type not in MEDIA_TYPES:
+            skipped += 1
+            continue
+        entries[n] = (tmdb_id, MEDIA_TYPES.index(media_type))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, INDEX_VERSION, len(entries)))
+        f.writelines(RECORD.pack(n, *entries[n]) for n in sorted(entries))
+    tmp.replace(path)
+    return len(entries), skipped
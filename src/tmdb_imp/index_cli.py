@@ -0,0 +1,83 @@
+import json
+import argparse
+from pathlib import Path
+from .config import IMDB_INDEX
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="tmdb-imp index",
+        description="Build and query the offline IMDb -> TMDB index used by imdb-list imports.",
+    )
+    sub = p.add_subparsers(dest="action", required=True)
+
+    build = sub.add_parser("build", help="Compile mapping dumps into the index")
+    build.add_argument(
+        "dumps",
+        type=Path,
+        nargs="*",
+        help="CSV/TSV (imdb_id,tmdb_id,media_type) or JSON lines with those keys; "
+             "later files win",
+    )
+    build.add_argument(
+        "--from-cache",
+        action="store_true",
+        help="Also include every IMDb title in the resolution cache (before the dumps)",
+    )
+    build.add_argument(
+        "-o", "--output",
+        type=Path,
+        default=IMDB_INDEX,
+        help=f"Index to write (default: {IMDB_INDEX})",
+    )
+
+    lookup = sub.add_parser("lookup", help="Look IMDb ids up in the index")
+    lookup.add_argument("imdb_ids", nargs="+", help="e.g. tt0111161")
+    lookup.add_argument("--index", type=Path, default=IMDB_INDEX, help="Index to read")
+
+    return p
+
+
+def main(argv=None):
+    import itertools
+    from .imdb_index import IMDbIndex, build_index, cache_rows, read_dump
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.action == "build":
+        if not args.dumps and not args.from_cache:
+            parser.error("give at least one dump, or --from-cache")
+
+        sources = []
+        store = None
+        if args.from_cache:
+            from .store import ResolveStore
+            store = ResolveStore()
+            sources.append(cache_rows(store))
+        sources += [read_dump(path) for path in args.dumps]
+
+        try:
+            written, skipped = build_index(itertools.chain(*sources), args.output)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        finally:
+            if store is not None:
+                store.close()
+        print(f"[INFO] Wrote {args.output}: {written} titles, {skipped} rows skipped")
+
+    elif args.action == "lookup":
+        try:
+            index = IMDbIndex.load(args.index)
+        except ValueError as e:
+            parser.error(str(e))
+        if index is None:
+            parser.error(f"{args.index} does not exist; run `tmdb-imp index build` first")
+        for imdb_id in args.imdb_ids:
+            found = index.get(imdb_id)
+            print(json.dumps({
+                "imdb_id": imdb_id,
+                "tmdb_id": found[0] if found else None,
+                "media_type": found[1] if found else None,
+            }))
+        index.close()
@@ -17,3 +17,11 @@ def ensure_lb_session(cookie_path: Path):
     u = input("Username: ")
     p = getpass.getpass("Password: ")
     return lb_login(u, p)
+
+
+def async_lb_session(session):
+    from curl_cffi.requests import AsyncSession
+    a = AsyncSession(impersonate=IMPERSONATE)
+    for c in session.cookies.jar:
+        a.cookies.set(c.name, c.value, domain=c.domain, path=c.path, secure=bool(c.secure))
+    return a
@@ -0,0 +1,148 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# bucket upper bounds for 0..1 ratios, e.g. how full a queue is
+RATIO_BUCKETS = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _fmt(key):
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS, unit="seconds"):
+        self.buckets = buckets
+        self.unit = unit  # Prometheus name suffix
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if not self.total:
+            return None
+        rank, seen = q * self.total, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.started = time.monotonic()
+
+    def _observe(self, name, value, labels, buckets, unit):
+        key = _key(name, labels)
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram(buckets, unit)
+            h.observe(value)
+
+    def observe(self, name, seconds, **labels):
+        self._observe(name, seconds, labels, BUCKETS, "seconds")
+
+    def observe_ratio(self, name, ratio, **labels):
+        self._observe(name, ratio, labels, RATIO_BUCKETS, "ratio")
+
+    def inc(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t, **labels)
+
+    def _total(self, name, **match):
+        return sum(
+            v for (n, labels), v in self.counters.items()
+            if n == name and all(dict(labels).get(k) == m for k, m in match.items())
+        )
+
+    # ---------- reports ----------
+    def summary(self):
+        with self.lock:
+            wall = time.monotonic() - self.started
+            # both summed over all workers: rate-limit sleeps happen inside the stages
+            sleep = self._total("rate_limit_sleep_seconds")
+            stages = sum(h.sum for (n, _), h in self.histograms.items() if n in {"resolve", "sink"})
+            hits = self._total("resolve_total", cached="true")
+            lookups = self._total("resolve_total")
+
+            return {
+                "wall_seconds": round(wall, 3),
+                "stage_seconds": round(stages, 3),
+                "sleep_seconds": round(sleep, 3),
+                "work_seconds": round(max(0.0, stages - sleep), 3),
+                "cache_hit_ratio": round(hits / lookups, 4) if lookups else None,
+                "timings": {
+                    _fmt(k): {
+                        "count": h.total,
+                        "sum": round(h.sum, 6),
+                        "mean": round(h.sum / h.total, 6) if h.total else None,
+                        "p50": h.quantile(0.50),
+                        "p99": h.quantile(0.99),
+                    }
+                    for k, h in sorted(self.histograms.items())
+                },
+                "counters": {_fmt(k): round(v, 6) for k, v in sorted(self.counters.items())},
+            }
+
+    def write_json(self, path):
+        path.write_text(json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path, prefix="tmdb_imp_"):
+        lines = []
+        with self.lock:
+            for (name, labels), h in sorted(self.histograms.items()):
+                full = f"{prefix}{name}_{h.unit}"
+                cumulative = 0
+                for bound, n in zip(h.buckets + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f"{_fmt((full + '_bucket', labels + (('le', bound),)))} {cumulative}")
+                lines.append(f"{_fmt((full + '_sum', labels))} {h.sum}")
+                lines.append(f"{_fmt((full + '_count', labels))} {h.total}")
+            for (name, labels), v in sorted(self.counters.items()):
+                lines.append(f"{_fmt((prefix + name, labels))} {v}")
+
+        # write-then-rename so the node exporter never reads a half-written file
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text("\n".join(lines) + "\n")
+        tmp.replace(path)
+
+
+# process-wide registry fed by the pipeline, rate limiter, store and journal
+metrics = Metrics()
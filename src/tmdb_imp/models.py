@@ -8,6 +8,10 @@ class ResolveStatus(Enum):
     BLOCKED = "blocked"
     ERROR = "error"
 
+class LoginError(RuntimeError):
+    # the Letterboxd login failed: nothing else can resolve, so the run stops
+    pass
+
 @dataclass
 class ResolveResult:
     status: ResolveStatus
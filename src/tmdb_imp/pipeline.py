@@ -1,11 +1,18 @@
 import time
+import hashlib
+from contextlib import asynccontextmanager
 from .util import sha1_json
-from .progress import load_completed_ids, record_success, record_error
-from .config import REQUEST_DELAY
-from .models import ResolveStatus
-from .progress import progress_line
+from .progress import ProgressJournal, progress_line
+from .metrics import metrics
+from .models import ResolveStatus, ResolveResult, LoginError
 
 def event_id(ev):
+    payload = "\x1e".join(f"{k}={v!r}" for k, v in sorted(ev.payload.items())) if ev.payload else ""
+    key = "\x1f".join((ev.kind, ev.lb_url, ev.date or "", payload))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+def legacy_event_id(ev):
+    # ids written by versions before the journal index; only used to honour old progress logs
     return sha1_json({
         "kind": ev.kind,
         "lb_url": ev.lb_url,
@@ -13,49 +20,340 @@ def event_id(ev):
         "payload": ev.payload,
     })
 
-def run(events, resolver, sink, *, dry_run=False, resume=True):
-    events = list(events)
-    completed = load_completed_ids() if resume else set()
-    total = len(events)
+def collect(events, into):
+    # pass events through while keeping them, to look at once the run is over
+    for ev in events:
+        into.append(ev)
+        yield ev
 
-    skipped = processed = 0
+def _open_journal(journal):
+    # always loaded: compaction rewrites the index from what is in memory
+    return (journal or ProgressJournal()).load()
 
-    for i, ev in enumerate(events, start=1):
-        eid = event_id(ev)
+def _source(ev):
+    if ev.tmdb_id:
+        return "plan"
+    return "imdb" if ev.lb_url.startswith("tt") else "letterboxd"
 
-        if resume and eid in completed:
-            skipped += 1
-            progress_line(i, total, "SKIPPED", ev.lb_url, cached=True)
-            continue
+def _planned(ev):
+    # events replayed from a plan arrive already resolved
+    res = ResolveResult(ResolveStatus.FOUND, ev.tmdb_id, ev.media_type, ev.lb_url)
+    res.cached = True
+    return res
 
-        try:
-            res = resolver.resolve(ev.lb_url)
+def _report(journal, i, total, ev, res):
+    cached = getattr(res, "cached", False)
+    metrics.inc(
+        "resolve_total",
+        source=_source(ev),
+        status=res.status.value,
+        cached="true" if cached else "false",
+    )
+    progress_line(
+        i, total,
+        res.status.value.upper(),
+        ev.lb_url,
+        cached=cached,
+    )
+
+    if res.status != ResolveStatus.FOUND:
+        metrics.inc("events_total", outcome=res.status.value)
+        journal.record_error(ev, res.error or res.status.value)
+        return False
+
+    ev.tmdb_id = res.tmdb_id
+    ev.media_type = res.media_type
+    return True
+
+def _settle(journal, results, total):
+    for (i, eid, ev), err in results:
+        if err is None:
+            metrics.inc("events_total", outcome="applied")
+            journal.record_success(eid, ev)
+        else:
+            _failed(journal, i, total, ev, err)
 
-            progress_line(
-                i, total,
-                res.status.value.upper(),
-                ev.lb_url,
-                cached=getattr(res, "cached", False),
-            )
+def _failed(journal, i, total, ev, err):
+    if isinstance(err, LoginError):
+        raise err  # not this event's fault: every later one would fail the same way
+    metrics.inc("events_total", outcome="error")
+    progress_line(i, total, "ERROR", ev.lb_url)
+    journal.record_error(ev, err)
 
-            if res.status != ResolveStatus.FOUND:
-                record_error(ev, res.status.value)
+def _applied(journal, i, total, eid, ev, writes):
+    if writes:
+        metrics.inc("events_total", outcome="applied")
+    else:
+        metrics.inc("events_total", outcome="unchanged")
+        progress_line(i, total, "UNCHANGED", ev.lb_url, cached=True)
+    journal.record_success(eid, ev)
+
+def run(events, resolver, sink, *, dry_run=False, resume=True, journal=None, total=None):
+    journal = _open_journal(journal)
+
+    skipped = processed = 0
+
+    try:
+        for i, ev in enumerate(events, start=1):
+            eid = event_id(ev)
+
+            if resume and journal.is_done(eid, ev):
+                skipped += 1
+                metrics.inc("events_total", outcome="skipped")
+                progress_line(i, total, "SKIPPED", ev.lb_url, cached=True)
                 continue
 
-            if dry_run:
+            try:
+                with metrics.timer("resolve", source=_source(ev)):
+                    res = _planned(ev) if ev.tmdb_id else resolver.resolve(ev.lb_url)
+
+                if not _report(journal, i, total, ev, res):
+                    continue
+
+                if dry_run:
+                    metrics.inc("events_total", outcome="resolved")
+                    processed += 1
+                    continue
+
+                if sink.batches(ev):
+                    chunk = sink.enqueue((i, eid, ev), ev)
+                    if chunk:
+                        with metrics.timer("sink", kind="list_bulk"):
+                            results = sink.write_chunk(chunk)
+                        _settle(journal, results, total)
+                else:
+                    with metrics.timer("sink", kind=ev.kind):
+                        writes = sink.apply(ev)
+                    _applied(journal, i, total, eid, ev, writes)
                 processed += 1
-                continue
 
-            ev.tmdb_id = res.tmdb_id
-            ev.media_type = res.media_type
-            sink.apply(ev)
-            record_success(eid, ev)
-            processed += 1
+            except Exception as e:
+                _failed(journal, i, total, ev, e)
+
+        chunk = [] if dry_run else sink.drain()
+        if chunk:
+            with metrics.timer("sink", kind="list_bulk"):
+                results = sink.write_chunk(chunk)
+            _settle(journal, results, total)
+    finally:
+        if resolver:
+            resolver.close()
+        journal.close()
+
+    print()
+
+async def _aresolve(journal, resolver, i, total, ev):
+    with metrics.timer("resolve", source=_source(ev)):
+        res = _planned(ev) if ev.tmdb_id else await resolver.aresolve(ev.lb_url)
+    return _report(journal, i, total, ev, res)
+
+async def _awrite(journal, sink, i, total, eid, ev):
+    if sink.batches(ev):
+        chunk = sink.enqueue((i, eid, ev), ev)
+        if chunk:
+            with metrics.timer("sink", kind="list_bulk"):
+                results = await sink.awrite_chunk(chunk)
+            _settle(journal, results, total)
+    else:
+        with metrics.timer("sink", kind=ev.kind):
+            writes = await sink.aapply(ev)
+        _applied(journal, i, total, eid, ev, writes)
+
+async def _afinish(journal, resolver, sink, total, dry_run):
+    try:
+        chunk = [] if dry_run else sink.drain()
+        if chunk:
+            with metrics.timer("sink", kind="list_bulk"):
+                results = await sink.awrite_chunk(chunk)
+            _settle(journal, results, total)
+    finally:
+        if resolver:
+            await resolver.aclose()
+            resolver.close()
+        journal.close()
+        if not dry_run:
+            await sink.aclose()
+
+# list positions only mean something if the adds land in input order
+ORDERED_KINDS = {"list", "watched"}
+
+class _Turns:
+    # ordered kinds get tickets in input order and reach the sink one ticket at a time;
+    # every ticket must be taken, also for events that end up skipped or failed
+    def __init__(self):
+        import asyncio
+        self.issued = 0
+        self.turn = 0
+        self.cond = asyncio.Condition()
+
+    def ticket(self, ev):
+        if ev.kind not in ORDERED_KINDS:
+            return None
+        ticket, self.issued = self.issued, self.issued + 1
+        return ticket
+
+    @asynccontextmanager
+    async def take(self, ticket):
+        if ticket is None:
+            yield
+            return
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.turn == ticket)
+        try:
+            yield
+        finally:
+            async with self.cond:
+                self.turn += 1
+                self.cond.notify_all()
+
+async def run_async(
+    events, resolver, sink, *, dry_run=False, resume=True, concurrency=8, journal=None,
+    total=None,
+):
+    import asyncio
+
+    journal = _open_journal(journal)
+
+    todo = iter(enumerate(events, start=1))
+    stats = {"skipped": 0, "processed": 0}
+    turns = _Turns()
+
+    async def worker():
+        # every worker pulls from the same iterator, so at most `concurrency`
+        # events are in flight and each one is handled exactly once. Resolution
+        # runs freely; list adds wait for their turn before they reach the sink.
+        for i, ev in todo:
+            ticket = None if dry_run else turns.ticket(ev)  # taken before any await
+            eid = event_id(ev)
+            ready = False
+
+            if resume and journal.is_done(eid, ev):
+                stats["skipped"] += 1
+                metrics.inc("events_total", outcome="skipped")
+                progress_line(i, total, "SKIPPED", ev.lb_url, cached=True)
+            else:
+                try:
+                    if await _aresolve(journal, resolver, i, total, ev):
+                        if dry_run:
+                            metrics.inc("events_total", outcome="resolved")
+                            stats["processed"] += 1
+                        else:
+                            ready = True
+                except Exception as e:
+                    _failed(journal, i, total, ev, e)
+
+            async with turns.take(ticket):
+                if not ready:
+                    continue
+                try:
+                    await _awrite(journal, sink, i, total, eid, ev)
+                    stats["processed"] += 1
+                except Exception as e:
+                    _failed(journal, i, total, ev, e)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        await _afinish(journal, resolver, sink, total, dry_run)
+
+    print()
+
+async def run_staged(
+    events, resolver, sink, *, dry_run=False, resume=True, resolve_workers=8, sink_workers=2,
+    queue_size=64, journal=None, total=None,
+):
+    import asyncio
+    import heapq
+
+    journal = _open_journal(journal)
+
+    todo = iter(enumerate(events, start=1))
+    queue = asyncio.Queue(max(1, queue_size))
+    stats = {"skipped": 0, "processed": 0, "put_blocked": 0.0, "get_idle": 0.0}
+
+    # ---- resolver stage -> queue, in input order ----
+    # events finish resolving out of order; each index (resolved, skipped or failed)
+    # parks in a heap until everything before it is done, then resolved ones are queued
+    finished = []
+    seq = {"release": 1}
+    release_lock = asyncio.Lock()
+    turns = _Turns()
+
+    async def release(i, item):
+        heapq.heappush(finished, (i, item))
+        async with release_lock:
+            while finished and finished[0][0] == seq["release"]:
+                _, item = heapq.heappop(finished)
+                seq["release"] += 1
+                if item is None:
+                    continue
+
+                ticket = turns.ticket(item[2])
+                t = time.perf_counter()
+                await queue.put(item + (ticket,))
+                waited = time.perf_counter() - t
+                stats["put_blocked"] += waited
+                metrics.inc("queue_blocked_seconds", waited, stage="resolve")
+                metrics.observe_ratio("queue_fill", queue.qsize() / queue.maxsize)
+
+    async def resolve_worker():
+        for i, ev in todo:
+            eid = event_id(ev)
+            item = None
+
+            if resume and journal.is_done(eid, ev):
+                stats["skipped"] += 1
+                metrics.inc("events_total", outcome="skipped")
+                progress_line(i, total, "SKIPPED", ev.lb_url, cached=True)
+            else:
+                try:
+                    if await _aresolve(journal, resolver, i, total, ev):
+                        if dry_run:
+                            metrics.inc("events_total", outcome="resolved")
+                            stats["processed"] += 1
+                        else:
+                            item = (i, eid, ev)
+                except Exception as e:
+                    _failed(journal, i, total, ev, e)
+
+            await release(i, item)
+
+    # ---- queue -> sink stage ----
+    # ordered kinds take turns by ticket, everything else is applied as it arrives
+
+    async def sink_worker():
+        while True:
+            t = time.perf_counter()
+            item = await queue.get()
+            waited = time.perf_counter() - t
+            stats["get_idle"] += waited
+            metrics.inc("queue_blocked_seconds", waited, stage="sink")
+            if item is None:
+                return
 
-        except Exception as e:
-            progress_line(i, total, "ERROR", ev.lb_url)
-            record_error(ev, e)
+            i, eid, ev, ticket = item
+            async with turns.take(ticket):
+                try:
+                    await _awrite(journal, sink, i, total, eid, ev)
+                    stats["processed"] += 1
+                except Exception as e:
+                    _failed(journal, i, total, ev, e)
 
-        time.sleep(REQUEST_DELAY)
+    sinks = [asyncio.create_task(sink_worker()) for _ in range(max(1, sink_workers))]
+    try:
+        await asyncio.gather(*(resolve_worker() for _ in range(max(1, resolve_workers))))
+        for _ in sinks:
+            await queue.put(None)
+        await asyncio.gather(*sinks)
+    finally:
+        for task in sinks:
+            task.cancel()
+        await _afinish(journal, resolver, sink, total, dry_run)
 
     print()
+    # resolvers blocked on a full queue: the sink is the bottleneck; sinks idle on an
+    # empty one: resolution is
+    print(
+        f"[INFO] queue: resolvers blocked {stats['put_blocked']:.1f}s on a full queue, "
+        f"sink idle {stats['get_idle']:.1f}s on an empty one"
+    )
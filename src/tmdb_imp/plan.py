@@ -0,0 +1,206 @@
+import gzip
+import json
+import time
+import argparse
+from collections import Counter
+from dataclasses import asdict
+from pathlib import Path
+from .config import PLAN_VERSION
+
+# gzip'd JSON lines: a header object, then per input file one {"stream": ...} record
+# followed by its events, each with its resolved TMDB id and the writes it would make
+PLAN_FORMAT = "tmdb-imp-plan"
+APPLIED = {"write", "unchanged"}  # statuses `apply` replays; the sink re-checks both
+
+
+# ---------- plan: resolve now, write later ----------
+def _record(i, ev, sink, journal):
+    from .pipeline import event_id
+
+    rec = {"i": i, "kind": ev.kind, "date": ev.date, "lb_url": ev.lb_url, "payload": ev.payload}
+    if ev.tmdb_id:
+        rec.update(tmdb_id=ev.tmdb_id, media_type=ev.media_type)
+        try:
+            ops = sink.planned_writes(ev)
+        except Exception as e:
+            rec.update(status="invalid", error=str(e))
+        else:
+            rec.update(status="write" if ops else "unchanged", ops=ops)
+    elif journal.is_done(event_id(ev), ev):
+        rec["status"] = "done"
+    else:
+        rec["status"] = "unresolved"
+    return rec
+
+
+def plan_main(argv=None):
+    from .cli import (
+        build_parser, tmdb_client, build_resolver, target_sink, open_streams, execute,
+        write_reports,
+    )
+    from .events import parse_events
+    from .pipeline import collect
+    from .progress import ProgressJournal
+
+    parser = build_parser()
+    parser.prog = "tmdb-imp plan"
+    parser.description = "Resolve an export and write the TMDB changes it would make to a plan file."
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        required=True,
+        help="Plan file to write (gzip JSON lines)",
+    )
+    args = parser.parse_args(argv)
+    args.dry_run = True
+
+    client = tmdb_client(parser)
+    resolver = build_resolver(args, client)
+
+    header = {
+        "format": PLAN_FORMAT,
+        "version": PLAN_VERSION,
+        "created": time.time(),
+        "source": str(args.csv),
+        "mode": args.mode,
+    }
+
+    sink = None
+    tmp = args.output.with_name(args.output.name + ".tmp")
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+
+            for name, mode, list_meta, rows, total in open_streams(args):
+                # plans never create lists; writes to a missing one name NEW_LIST
+                sink, target = target_sink(sink, client, list_meta, create_list=False)
+
+                events, journal = [], ProgressJournal(target=list_meta)
+                execute(args, collect(parse_events(mode, rows), events), resolver, None, total, journal)
+
+                records = [_record(i, ev, target, journal) for i, ev in enumerate(events, start=1)]
+                counts = Counter(r["status"] for r in records)
+                f.write(json.dumps({
+                    "stream": name,
+                    "mode": mode,
+                    "list": asdict(list_meta) if list_meta else None,
+                    "counts": counts,
+                }) + "\n")
+                for rec in records:
+                    f.write(json.dumps(rec) + "\n")
+
+                print(f"[PLAN] {name}: " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+        tmp.replace(args.output)
+    finally:
+        write_reports(args)
+
+    print(f"[INFO] Wrote {args.output}; run `tmdb-imp apply {args.output}` to execute it")
+
+
+# ---------- apply: replay a plan without any resolver ----------
+def parse_shard(raw):
+    try:
+        i, n = (int(x) for x in raw.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {raw!r}")
+    if not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{n - 1}, got {i}")
+    return i, n
+
+
+def in_shard(ev, shard):
+    from .pipeline import event_id
+    i, n = shard
+    return n == 1 or int(event_id(ev)[:8], 16) % n == i
+
+
+def read_plan(path, shard=(0, 1)):
+    # yields (name, mode, list_meta, events, total) per input file of the plan
+    from .models import LBEvent, LBListMeta
+
+    def flush(stream, events):
+        meta = LBListMeta(**stream["list"]) if stream["list"] else None
+        return stream["stream"], stream["mode"], meta, events, len(events)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != PLAN_FORMAT:
+            raise ValueError(f"{path} is not a tmdb-imp plan")
+        if header.get("version", 0) > PLAN_VERSION:
+            raise ValueError(
+                f"{path} is plan version {header['version']}; "
+                f"this tmdb-imp reads up to {PLAN_VERSION}"
+            )
+
+        stream, events = None, []
+        for line in f:
+            rec = json.loads(line)
+            if "stream" in rec:
+                if stream is not None:
+                    yield flush(stream, events)
+                stream, events = rec, []
+                continue
+            if rec["status"] not in APPLIED:
+                continue
+
+            ev = LBEvent(
+                rec["kind"], rec["date"], rec["lb_url"], rec["payload"],
+                tmdb_id=rec["tmdb_id"], media_type=rec["media_type"],
+            )
+            if in_shard(ev, shard):
+                events.append(ev)
+
+        if stream is not None:
+            yield flush(stream, events)
+
+
+def build_apply_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="tmdb-imp apply",
+        description="Execute a plan written by `tmdb-imp plan` (no Letterboxd access needed).",
+    )
+    p.add_argument("plan", type=Path, help="Plan file")
+    p.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        metavar="I/N",
+        help="Apply only shard I of N (0-based), to split one plan across workers",
+    )
+    p.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore progress cache and reapply everything",
+    )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Apply up to N events at once (default: 1, sequential)",
+    )
+    p.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Write once per film and event kind (latest rating by date)",
+    )
+    p.add_argument("--report", type=Path, help="Write a JSON run report to this path")
+    p.add_argument("--prom", type=Path, help="Write run metrics as a Prometheus textfile")
+    p.set_defaults(dry_run=False, sink_workers=0, queue_size=64)
+    return p
+
+
+def apply_main(argv=None):
+    from .cli import tmdb_client, target_sink, execute, write_reports
+
+    parser = build_apply_parser()
+    args = parser.parse_args(argv)
+    client = tmdb_client(parser)
+
+    sink = None
+    try:
+        for name, mode, list_meta, events, total in read_plan(args.plan, args.shard):
+            print(f"[INFO] {name}: {mode}")
+            sink, target = target_sink(sink, client, list_meta)
+            execute(args, iter(events), None, target, total, list_meta=list_meta)
+    finally:
+        write_reports(args)
@@ -1,18 +1,115 @@
+import os
 import json
 import time
-from .config import PROGRESS_LOG, ERROR_LOG
-
-def load_completed_ids() -> set[str]:
-    if not PROGRESS_LOG.exists():
-        return set()
-    return {
-        json.loads(line)["event_id"]
-        for line in PROGRESS_LOG.read_text().splitlines()
+import threading
+from .metrics import metrics
+from .config import (
+    PROGRESS_LOG,
+    PROGRESS_INDEX,
+    ERROR_LOG,
+    JOURNAL_FLUSH_EVERY,
+    JOURNAL_FLUSH_INTERVAL,
+    JOURNAL_COMPACT_EVERY,
+)
+
+ID_BYTES = 16          # event_id() digests
+LEGACY_ID_BYTES = 20   # sha1 ids written before the index existed
+
+# resolve outcomes that no amount of retrying will change
+PERMANENT = {"not_found"}
+
+
+def retryable(err):
+    if isinstance(err, str):
+        return err not in PERMANENT
+    status = getattr(err, "status", None)  # TMDBError
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    # bad input (rating out of range, unknown kind, missing ids) fails the same way every time
+    return not isinstance(err, (ValueError, KeyError, TypeError))
+
+
+def error_record(ev, err, target=None, retries=0):
+    from dataclasses import asdict
+    from .pipeline import event_id
+
+    rec = {
+        "event_id": event_id(ev),
+        "kind": ev.kind,
+        "date": ev.date,
+        "lb_url": ev.lb_url,
+        "payload": ev.payload,
+        "list": asdict(target) if target is not None and not isinstance(target, dict) else target,
+        "error": str(err),
+        "retryable": retryable(err),
+        "retries": retries,
+        "ts": time.time(),
     }
+    if ev.tmdb_id:
+        rec.update(tmdb_id=ev.tmdb_id, media_type=ev.media_type)
+    return rec
+
+
+class ProgressJournal:
+    def __init__(self, log=PROGRESS_LOG, index=PROGRESS_INDEX, errors=ERROR_LOG, target=None):
+        self.log = log
+        self.target = target  # list the run writes to, kept with errors so `retry` can find it
+        self.index = index
+        self.legacy_index = index.with_suffix(".legacy.idx")
+        self.errors = errors
 
-def record_success(event_id, ev):
-    with PROGRESS_LOG.open("a", encoding="utf-8") as f:
-        f.write(json.dumps({
+        self.done = set()
+        self.legacy = set()
+        self.log_lines = 0
+
+        self.pending = []
+        self.pending_errors = []
+        self.last_flush = time.monotonic()
+
+    # ---------- loading ----------
+    def _read_index(self, path, width):
+        if not path.exists():
+            return set()
+        h = path.read_bytes().hex()
+        step = width * 2
+        return {h[i:i + step] for i in range(0, len(h), step)}
+
+    def load(self):
+        # may be called again on the same journal (e.g. --coalesce runs twice)
+        self.log_lines = 0
+        self.done = self._read_index(self.index, ID_BYTES)
+        self.legacy = self._read_index(self.legacy_index, LEGACY_ID_BYTES)
+
+        # the log only holds what was written since the last compaction
+        if self.log.exists():
+            with self.log.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        eid = json.loads(line)["event_id"]
+                    except (ValueError, KeyError):
+                        continue  # torn write from a crash
+                    if len(eid) == ID_BYTES * 2:
+                        self.done.add(eid)
+                    elif len(eid) == LEGACY_ID_BYTES * 2:
+                        self.legacy.add(eid)
+                    self.log_lines += 1
+
+        if self.log_lines >= JOURNAL_COMPACT_EVERY:
+            self.compact()
+        return self
+
+    def is_done(self, eid, ev):
+        if eid in self.done:
+            return True
+        if self.legacy:
+            from .pipeline import legacy_event_id
+            return legacy_event_id(ev) in self.legacy
+        return False
+
+    # ---------- buffered writes ----------
+    def record_success(self, event_id, ev):
+        self.done.add(event_id)
+        self.pending.append(json.dumps({
             "event_id": event_id,
             "kind": ev.kind,
             "lb_url": ev.lb_url,
@@ -20,19 +117,88 @@ def record_success(event_id, ev):
             "media_type": ev.media_type,
             "ts": time.time(),
         }) + "\n")
+        self._maybe_flush()
+
+    def record_error(self, ev, err):
+        self.pending_errors.append(json.dumps(error_record(ev, err, self.target)) + "\n")
+        self._maybe_flush()
+
+    def rewrite_errors(self, records):
+        # replaces the error log, e.g. with only what `retry` could not fix
+        self.flush()
+        tmp = self.errors.with_suffix(".tmp")
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("w", encoding="utf-8") as f:
+            f.writelines(json.dumps(rec) + "\n" for rec in records)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.errors)
+
+    def _maybe_flush(self):
+        if (
+            len(self.pending) + len(self.pending_errors) >= JOURNAL_FLUSH_EVERY
+            or time.monotonic() - self.last_flush >= JOURNAL_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def _append(self, path, lines):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with metrics.timer("journal_flush"), path.open("a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def flush(self):
+        if self.pending:
+            self._append(self.log, self.pending)
+            self.log_lines += len(self.pending)
+            self.pending = []
+        if self.pending_errors:
+            self._append(self.errors, self.pending_errors)
+            self.pending_errors = []
+        self.last_flush = time.monotonic()
+
+        if self.log_lines >= JOURNAL_COMPACT_EVERY:
+            self.compact()
+
+    # ---------- compaction: fold the log into the binary index ----------
+    def _write_index(self, path, ids):
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            f.write(bytes.fromhex("".join(sorted(ids))))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(path)
+
+    def compact(self):
+        self.index.parent.mkdir(parents=True, exist_ok=True)
+        self._write_index(self.index, self.done)
+        if self.legacy:
+            self._write_index(self.legacy_index, self.legacy)
+
+        # everything in the log is now in the index; a crash before this point
+        # only leaves duplicates behind
+        self.log.write_text("")
+        self.log_lines = 0
+
+    def close(self):
+        self.flush()
+
+
+_hooks = threading.local()
+
+
+def on_progress(callback):
+    # send this thread's progress to callback(i, total, status, url, cached) instead of
+    # the terminal, e.g. one job of `tmdb-imp serve`; None restores the terminal
+    _hooks.callback = callback
 
-def record_error(ev, err):
-    with ERROR_LOG.open("a", encoding="utf-8") as f:
-        f.write(json.dumps({
-            "kind": ev.kind,
-            "lb_url": ev.lb_url,
-            "payload": ev.payload,
-            "error": str(err),
-            "ts": time.time(),
-        }) + "\n")
 
 def progress_line(i, total, status, url, cached=False):
+    callback = getattr(_hooks, "callback", None)
+    if callback is not None:
+        callback(i, total, status, url, cached)
+        return
     tag = "CACHED" if cached else "LIVE"
-    msg = f"[{i}/{total}] {status:<9} {tag:<6} {url}"
+    msg = f"[{i}/{'?' if total is None else total}] {status:<9} {tag:<6} {url}"
     print("\r" + msg[:120].ljust(120), end="", flush=True)
-
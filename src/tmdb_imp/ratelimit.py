@@ -0,0 +1,141 @@
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from .config import RATE_LIMITS, RATE_HOST_ALIASES, MIN_RATE, MAX_RETRIES, MAX_RETRY_AFTER
+from .metrics import metrics
+
+THROTTLED = {429, 503}
+
+
+class TokenBucket:
+    def __init__(self, host, rate, max_rate):
+        self.host = host
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # charge one token and return how long the caller must wait for it
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, self.blocked_until - now, 0.0)
+
+    # ---- AIMD: creep up on success, halve on throttling ----
+    def success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + 0.02 * self.max_rate)
+            self.burst = max(1.0, self.rate)
+
+    def throttled(self, retry_after):
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.burst = max(1.0, self.rate)
+            self.tokens = min(self.tokens, 0.0)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+def retry_after(resp, attempt) -> float:
+    # Retry-After is either delay-seconds or an HTTP-date; a server asking for hours
+    # gets MAX_RETRY_AFTER, after which the request is simply throttled again
+    delay = _header_delay(resp.headers.get("Retry-After"))
+    if delay is None:
+        return min(60.0, 2.0 ** attempt)
+    return min(MAX_RETRY_AFTER, delay)
+
+
+def _header_delay(raw):
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:  # "-0000" dates come back naive; they are UTC
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    def __init__(self, limits):
+        self.limits = limits
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url) -> TokenBucket:
+        host = (urlsplit(url).hostname or "").removeprefix("www.")
+        host = RATE_HOST_ALIASES.get(host, host)
+
+        with self.lock:
+            b = self.buckets.get(host)
+            if b is None:
+                rate, max_rate = self.limits.get(host, self.limits["default"])
+                b = self.buckets[host] = TokenBucket(host, rate, max_rate)
+            return b
+
+    def call(self, url, send):
+        b = self.bucket(url)
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                metrics.inc("http_retries_total", host=b.host)
+            wait = b.reserve()
+            if wait:
+                metrics.inc("rate_limit_sleep_seconds", wait, host=b.host)
+                time.sleep(wait)
+
+            metrics.inc("http_requests_total", host=b.host)
+            resp = send()
+            if resp.status_code not in THROTTLED:
+                b.success()
+                return resp
+            metrics.inc("http_throttled_total", host=b.host, status=resp.status_code)
+            b.throttled(retry_after(resp, attempt))
+            if attempt < MAX_RETRIES:
+                resp.close()  # a streamed body would keep its transfer open otherwise
+        return resp
+
+    async def acall(self, url, send):
+        import asyncio
+        b = self.bucket(url)
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                metrics.inc("http_retries_total", host=b.host)
+            wait = b.reserve()
+            if wait:
+                metrics.inc("rate_limit_sleep_seconds", wait, host=b.host)
+                await asyncio.sleep(wait)
+
+            metrics.inc("http_requests_total", host=b.host)
+            resp = await send()
+            if resp.status_code not in THROTTLED:
+                b.success()
+                return resp
+            metrics.inc("http_throttled_total", host=b.host, status=resp.status_code)
+            b.throttled(retry_after(resp, attempt))
+            if attempt < MAX_RETRIES:
+                await aclose_stream(resp)
+        return resp
+
+
+async def aclose_stream(resp):
+    # drops a streamed response: curl_cffi's aclose() only waits for the transfer, and
+    # quit_now makes its write callback refuse the next chunk, as close() does
+    if getattr(resp, "quit_now", None) is not None:
+        resp.quit_now.set()
+    await resp.aclose()
+
+
+# shared by every resolver, sink and client in the process
+limiter = RateLimiter(RATE_LIMITS)
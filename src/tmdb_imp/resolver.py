@@ -1,102 +1,235 @@
-import re
 import time
-from bs4 import BeautifulSoup
-from .models import ResolveResult, ResolveStatus
-from .config import RESOLVE_CACHE
-from .util import load_json, save_json
+from .models import ResolveResult, ResolveStatus, LoginError
+from .metrics import metrics
+from .store import is_fresh
+from .extract import scan, ascan, tmdb_link
+from .identity import canonical_url
+from .ratelimit import limiter, aclose_stream, THROTTLED
+from .config import LETTERBOXD_HOSTS
 
 
 class MultiResolver:
-    def __init__(self, lb, imdb):
+    def __init__(self, lb, imdb, lb_hosts=LETTERBOXD_HOSTS):
         self.lb = lb
         self.imdb = imdb
+        self.lb_hosts = lb_hosts
 
-    def resolve(self, src):
+    def _pick(self, src):
         if src.startswith("tt"):
-            return self.imdb.resolve(src)
-        if "boxd.it" in src or "letterboxd.com" in src:
-            return self.lb.resolve(src)
+            return self.imdb
+        if any(h in src for h in self.lb_hosts):
+            return self.lb
         raise ValueError(f"Unknown source: {src}")
 
+    def resolve(self, src):
+        return self._pick(src).resolve(src)
 
-class LetterboxdResolver:
-    def __init__(self, session):
-        self.session = session
-        self.cache = load_json(RESOLVE_CACHE, {})
+    def reset_backoff(self, src):
+        self._pick(src).reset_backoff(src)
 
-    def resolve(self, lb_url: str) -> ResolveResult:
-        url = lb_url.rstrip("/")
-        cached = self.cache.get(url)
-
-        # ---- CACHE HIT ----
-        if cached and cached["status"] in {"found", "not_found", "blocked"}:
-            res = ResolveResult(
-                ResolveStatus(cached["status"]),
-                cached.get("tmdb_id"),
-                cached.get("media_type"),
-                url,
-            )
-            res.cached = True
-            return res
+    async def aresolve(self, src):
+        return await self._pick(src).aresolve(src)
 
-        # ---- LIVE FETCH ----
-        r = self.session.get(url, timeout=20)
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        footer = soup.select_one("p.text-link.text-footer")
-        if not footer:
-            return self._cache(url, ResolveStatus.NOT_FOUND)
-
-        for a in footer.find_all("a", href=True):
-            if "themoviedb.org" in a["href"]:
-                m = re.search(r"/(movie|tv)/(\d+)", a["href"])
-                if m:
-                    return self._cache(
-                        url,
-                        ResolveStatus.FOUND,
-                        int(m.group(2)),
-                        m.group(1),
-                    )
-
-        return self._cache(url, ResolveStatus.NOT_FOUND)
-
-    def _cache(self, url, status, tmdb_id=None, media_type=None):
-        self.cache[url] = {
-            "status": status.value,
-            "tmdb_id": tmdb_id,
-            "media_type": media_type,
-            "ts": time.time(),
-        }
-        save_json(RESOLVE_CACHE, self.cache)
-
-        res = ResolveResult(status, tmdb_id, media_type, url)
+    async def aclose(self):
+        await self.lb.aclose()
+        await self.imdb.aclose()
+
+    def close(self):
+        self.lb.close()
+        self.imdb.close()
+
+
+class CachedResolver:
+    def __init__(self, store):
+        self.store = store
+
+    def close(self):
+        self.store.flush()
+
+    def reset_backoff(self, key):
+        self.store.clear_backoff(key)
+
+    def _lookup(self, key):
+        cached = self.store.get(key)
+
+        # ---- CACHE HIT ---- (stale rows fall through and are revalidated)
+        if cached and is_fresh(cached):
+            return self._hit(key, cached)
+        return None
+
+    def _hit(self, key, cached):
+        res = ResolveResult(
+            ResolveStatus(cached["status"]),
+            cached.get("tmdb_id"),
+            cached.get("media_type"),
+            key,
+        )
+        if res.status == ResolveStatus.ERROR:
+            res.error = f"backing off until {time.ctime(cached['next_try'])}"
+        res.cached = True
+        return res
+
+    def _failure(self, key, err):
+        # back off this key; a stale answer beats none
+        self.store.fail(key)
+        cached = self.store.get(key)
+        if cached and cached["status"] != ResolveStatus.ERROR.value:
+            metrics.inc("resolve_stale_served_total")
+            return self._hit(key, cached)
+        raise err
+
+    def _cache(self, key, status, tmdb_id=None, media_type=None):
+        self.store.put(key, status.value, tmdb_id, media_type)
+
+        res = ResolveResult(status, tmdb_id, media_type, key)
         res.cached = False
         return res
 
 
-class IMDbResolver:
-    def __init__(self, api_key):
-        self.api_key = api_key
+class LetterboxdResolver(CachedResolver):
+    def __init__(self, session, store, connect=None):
+        super().__init__(store)
+        self._session = session
+        self.connect = connect
+        self.asession = None
 
-    def resolve(self, imdb_id):
-        import tmdbsimple as tmdb
-        tmdb.API_KEY = self.api_key
+    def reset_backoff(self, lb_url):
+        self.store.clear_backoff(self.store.canonical(canonical_url(lb_url)))
 
-        r = tmdb.Find(imdb_id)
-        res = r.info(external_source="imdb_id")
+    @property
+    def session(self):
+        # logging in is deferred until a page misses the cache
+        if self._session is None:
+            try:
+                self._session = self.connect()
+            except Exception as e:
+                raise LoginError(f"Letterboxd login failed: {e!r}") from e
+        return self._session
 
+    def resolve(self, lb_url: str) -> ResolveResult:
+        url = canonical_url(lb_url)
+        key = self.store.canonical(url)
+        hit = self._lookup(key)
+        if hit:
+            return hit
+
+        # ---- LIVE FETCH ----
+        # log in first: a failed login must stop the run, not back off this film
+        session = self.session
+        try:
+            r = limiter.call(url, lambda: session.get(url, timeout=20, stream=True))
+            try:
+                _check_status(r)
+                page = scan(r.iter_content())
+            finally:
+                r.close()
+        except Exception as e:
+            return self._failure(key, e)
+        return self._parse(url, r.url, page)
+
+    async def aresolve(self, lb_url: str) -> ResolveResult:
+        url = canonical_url(lb_url)
+        key = self.store.canonical(url)
+        hit = self._lookup(key)
+        if hit:
+            return hit
+
+        if self.asession is None:
+            from .lb_session import async_lb_session
+            self.asession = async_lb_session(self.session)
+
+        try:
+            r = await limiter.acall(url, lambda: self.asession.get(url, timeout=20, stream=True))
+            try:
+                _check_status(r)
+                page = await ascan(r.aiter_content())
+            finally:
+                await aclose_stream(r)
+        except Exception as e:
+            return self._failure(key, e)
+        return self._parse(url, r.url, page)
+
+    async def aclose(self):
+        if self.asession is not None:
+            await self.asession.close()
+            self.asession = None
+
+    def _parse(self, url, final_url, page):
+        # short links redirect to the film page: key the result on where we landed
+        node = canonical_url(final_url) if final_url else url
+        self.store.alias(url, node)
+
+        link = tmdb_link(page)
+        if not link:
+            return self._cache(node, ResolveStatus.NOT_FOUND)
+
+        media_type, tmdb_id = link
+        # the same footer names the IMDb title, which saves IMDbResolver a find call later
+        imdb_id = page.imdb_id()
+        if imdb_id:
+            self.store.put(imdb_id, ResolveStatus.FOUND.value, tmdb_id, media_type)
+        return self._cache(node, ResolveStatus.FOUND, tmdb_id, media_type)
+
+
+def _check_status(r):
+    # a throttled or broken page says nothing about the film; don't cache it as NOT_FOUND
+    if r.status_code in THROTTLED or r.status_code >= 500:
+        raise RuntimeError(f"HTTP {r.status_code} from {r.url}")
+
+
+class IMDbResolver(CachedResolver):
+    def __init__(self, client, store, index=None):
+        super().__init__(store)
+        self.client = client
+        self.aclient = None
+        self.index = index  # optional IMDbIndex, checked before the cache and the API
+
+    def _indexed(self, imdb_id):
+        found = self.index.get(imdb_id) if self.index is not None else None
+        if found is None:
+            return None
+        metrics.inc("imdb_index_hits_total")
+        res = ResolveResult(ResolveStatus.FOUND, found[0], found[1], imdb_id)
+        res.cached = True
+        return res
+
+    def resolve(self, imdb_id):
+        hit = self._indexed(imdb_id) or self._lookup(imdb_id)
+        if hit:
+            return hit
+
+        try:
+            res = self.client.get(f"find/{imdb_id}", external_source="imdb_id")
+        except Exception as e:
+            return self._failure(imdb_id, e)
+        return self._result(imdb_id, res)
+
+    async def aresolve(self, imdb_id):
+        hit = self._indexed(imdb_id) or self._lookup(imdb_id)
+        if hit:
+            return hit
+
+        if self.aclient is None:
+            self.aclient = self.client.asynchronous()
+
+        try:
+            res = await self.aclient.get(f"find/{imdb_id}", external_source="imdb_id")
+        except Exception as e:
+            return self._failure(imdb_id, e)
+        return self._result(imdb_id, res)
+
+    async def aclose(self):
+        if self.aclient is not None:
+            await self.aclient.aclose()
+            self.aclient = None
+
+    def _result(self, imdb_id, res):
         if res.get("movie_results"):
             m = res["movie_results"][0]
-            out = ResolveResult(ResolveStatus.FOUND, m["id"], "movie", imdb_id)
-            out.cached = False
-            return out
+            return self._cache(imdb_id, ResolveStatus.FOUND, m["id"], "movie")
 
         if res.get("tv_results"):
             t = res["tv_results"][0]
-            out = ResolveResult(ResolveStatus.FOUND, t["id"], "tv", imdb_id)
-            out.cached = False
-            return out
+            return self._cache(imdb_id, ResolveStatus.FOUND, t["id"], "tv")
 
-        out = ResolveResult(ResolveStatus.NOT_FOUND, None, None, imdb_id)
-        out.cached = False
-        return out
+        return self._cache(imdb_id, ResolveStatus.NOT_FOUND)
@@ -0,0 +1,240 @@
+import os
+import json
+import random
+import argparse
+import itertools
+from pathlib import Path
+from .config import DEFAULT_COOKIE_JAR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="tmdb-imp retry",
+        description="Retry the retryable failures recorded in errors.jsonl.",
+    )
+    p.add_argument(
+        "--cookies",
+        type=Path,
+        default=None,
+        help="Letterboxd cookie jar (default: the manifest's, else lb_cookies.json)",
+    )
+    p.add_argument(
+        "--manifest",
+        type=Path,
+        help="Batch manifest naming the account given by --account",
+    )
+    p.add_argument(
+        "--account",
+        help="Retry this batch account's failures, with its session and state",
+    )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Events retried at once (default: 4)",
+    )
+    p.add_argument(
+        "--attempts",
+        type=int,
+        default=4,
+        help="Tries per event in this run before it is left in the error log (default: 4)",
+    )
+    p.add_argument(
+        "--base-delay",
+        type=float,
+        default=1.0,
+        help="Backoff before the second try, doubled for each further try (default: 1s)",
+    )
+    p.add_argument(
+        "--max-delay",
+        type=float,
+        default=60.0,
+        help="Upper bound on a single backoff (default: 60s)",
+    )
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be retried",
+    )
+    p.add_argument("--report", type=Path, help="Write a JSON run report to this path")
+    p.add_argument("--prom", type=Path, help="Write run metrics as a Prometheus textfile")
+    return p
+
+
+# ---------- error log -> events ----------
+def _event(rec):
+    from .models import LBEvent
+    return LBEvent(
+        rec["kind"], rec.get("date") or "", rec["lb_url"], rec.get("payload") or {},
+        tmdb_id=rec.get("tmdb_id"), media_type=rec.get("media_type"),
+    )
+
+
+def load_failures(path, journal):
+    # latest record per event wins; events that have since succeeded are dropped
+    from .pipeline import event_id
+    from .progress import retryable
+
+    latest = {}
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash
+                latest[rec.get("event_id") or event_id(_event(rec))] = rec
+
+    retry, permanent = {}, []
+    for eid, rec in latest.items():
+        if not rec.get("event_id"):
+            # written before error records kept the event's ID, date and list: it can't
+            # be rebuilt into the event the import saw, so a retry would write it twice
+            permanent.append(rec)
+            continue
+        if journal.is_done(eid, _event(rec)):
+            continue
+        if rec.get("retryable", retryable(rec["error"])):
+            retry[eid] = rec
+        else:
+            permanent.append(rec)
+    return retry, permanent
+
+
+# ---------- retry loop ----------
+async def retry_all(failures, resolver, sinks, journal, args):
+    import asyncio
+    from .metrics import metrics
+    from .models import ResolveStatus, LoginError
+    from .progress import error_record, progress_line, retryable
+
+    slots = asyncio.Semaphore(max(1, args.concurrency))
+    done = itertools.count(1)
+    total = len(failures)
+
+    async def attempt(ev, sink):
+        if not ev.tmdb_id:
+            # the resolve cache may still be backing off this page: retry means now
+            resolver.reset_backoff(ev.lb_url)
+            res = await resolver.aresolve(ev.lb_url)
+            if res.status != ResolveStatus.FOUND:
+                return res.error or res.status.value
+            ev.tmdb_id, ev.media_type = res.tmdb_id, res.media_type
+        await sink.aapply(ev)
+        return None
+
+    async def one(eid, rec):
+        ev = _event(rec)
+        sink = sinks[_list_key(rec)]
+        err = None
+
+        for n in range(max(1, args.attempts)):
+            if n:
+                # full jitter, so a burst of failures doesn't come back in lockstep
+                delay = random.uniform(0, min(args.max_delay, args.base_delay * 2 ** (n - 1)))
+                metrics.inc("retry_sleep_seconds", delay)
+                await asyncio.sleep(delay)
+
+            async with slots:
+                try:
+                    err = await attempt(ev, sink)
+                except LoginError:
+                    raise
+                except Exception as e:
+                    err = e
+            if err is None or not retryable(err):
+                break
+
+        if err is None:
+            metrics.inc("events_total", outcome="retried")
+            journal.record_success(eid, ev)
+            progress_line(next(done), total, "RETRIED", ev.lb_url)
+            return None
+
+        metrics.inc("events_total", outcome="error")
+        progress_line(next(done), total, "ERROR", ev.lb_url)
+        return error_record(ev, err, rec.get("list"), retries=rec.get("retries", 0) + 1)
+
+    try:
+        results = await asyncio.gather(*(one(eid, rec) for eid, rec in failures.items()))
+    finally:
+        await resolver.aclose()
+        resolver.close()
+        for sink in sinks.values():
+            await sink.aclose()
+    print()
+    return [rec for rec in results if rec is not None]
+
+
+def _list_key(rec):
+    return json.dumps(rec.get("list"), sort_keys=True)
+
+
+def main(argv=None):
+    import asyncio
+    from .cli import tmdb_client, build_resolver, target_sink, write_reports
+    from .models import LBListMeta
+    from .workspace import Workspace, DEFAULT_WORKSPACE
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    acc, ws = None, DEFAULT_WORKSPACE
+    if args.account or args.manifest:
+        acc = batch_account(parser, args)
+        ws = Workspace.for_account(acc["name"])
+    args.cookies = args.cookies or DEFAULT_COOKIE_JAR
+
+    journal = ws.journal().load()
+    failures, permanent = load_failures(ws.errors, journal)
+    print(f"[INFO] {len(failures)} retryable, {len(permanent)} permanent failures in {ws.errors}")
+    if args.dry_run or not failures:
+        journal.close()
+        return
+
+    if acc:
+        from .batch import account_client
+        api_key = os.environ.get("TMDB_API_KEY")
+        if not api_key and not acc.get("api_key"):
+            parser.error("TMDB_API_KEY environment variable must be set")
+        client = account_client(acc, api_key)
+    else:
+        client = tmdb_client(parser)
+    resolver = build_resolver(args, client)
+
+    base, sinks = None, {}
+    for rec in failures.values():
+        key = _list_key(rec)
+        if key not in sinks:
+            meta = LBListMeta(**rec["list"]) if rec.get("list") else None
+            base, sinks[key] = target_sink(base, client, meta, **ws.sink_kwargs())
+
+    try:
+        still_failing = asyncio.run(retry_all(failures, resolver, sinks, journal, args))
+        # the log shrinks to what is still broken: permanent failures and this run's misses
+        journal.rewrite_errors(permanent + still_failing)
+        print(
+            f"[INFO] {len(failures) - len(still_failing)} recovered, "
+            f"{len(still_failing)} still failing"
+        )
+    finally:
+        journal.close()
+        write_reports(args)
+
+
+def batch_account(parser, args):
+    # the manifest entry of --account; also settles which cookie jar to use
+    from .batch import load_manifest
+
+    if not (args.account and args.manifest):
+        parser.error("--account and --manifest go together")
+    try:
+        accounts, cookies = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(f"bad manifest: {e}")
+    args.cookies = args.cookies or cookies
+
+    for acc in accounts:
+        if acc["name"] == args.account:
+            return acc
+    parser.error(f"not in the manifest: {args.account}")
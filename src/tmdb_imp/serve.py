@@ -0,0 +1,363 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter, defaultdict, deque
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import JOBS_DIR, SERVE_MAX_UPLOAD, SERVE_KEEP_JOBS, TMDB_SESSION_FILE
+
+# per-job import options, as query parameters of POST /jobs
+FLAGS = {"dry_run", "no_resume", "incremental", "coalesce"}
+NUMBERS = {"concurrency", "sink_workers", "queue_size"}
+TRUE = {"1", "true", "yes", "on"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="tmdb-imp serve",
+        description="Run imports as jobs submitted over a local HTTP API, keeping the "
+                    "resolution cache and sessions warm between them.",
+    )
+    p.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    p.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    p.add_argument("--workers", type=int, default=2, help="Jobs run at once (default: 2)")
+    p.add_argument(
+        "--manifest",
+        type=Path,
+        help="Accounts jobs may target with account=NAME (same format as `batch`)",
+    )
+    p.add_argument(
+        "--cookies",
+        type=Path,
+        default=None,
+        help="Letterboxd cookie jar (default: the manifest's, else lb_cookies.json)",
+    )
+    p.add_argument(
+        "--token",
+        default=os.environ.get("TMDB_IMP_SERVE_TOKEN"),
+        help="Require `Authorization: Bearer TOKEN` on every request "
+             "(default: $TMDB_IMP_SERVE_TOKEN)",
+    )
+    return p
+
+
+# ---------- jobs ----------
+class Job:
+    def __init__(self, mode, account, args):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.account = account
+        self.args = args
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = self.finished = None
+        self.processed = 0
+        self.position = None
+        self.counts = Counter()
+        self.error = None
+
+    def progress(self, i, total, status, url, cached=False):
+        # progress hook of the worker thread running this job
+        self.processed += 1
+        self.position = [i, total]
+        self.counts[status.lower()] += 1
+
+    def finish(self, error=None):
+        self.finished = time.time()
+        self.status = "failed" if error else "done"
+        self.error = str(error) if error else None
+
+    def view(self):
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "account": self.account,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "processed": self.processed,
+            "position": self.position,  # [event, total] within the file being imported
+            "counts": self.counts,
+            "error": self.error,
+        }
+
+
+class Service:
+    def __init__(self, args, default_client, accounts):
+        from .store import ResolveStore
+
+        self.args = args
+        self.default_client = default_client
+        self.accounts = accounts
+        self.clients = {}
+        self.lookup = None  # the client IMDb lookups run under, for every account
+        self.queue = queue.Queue()
+        self.jobs = {}  # in submission order
+        self.lock = threading.Lock()
+        # jobs of one account share its journal and list IDs, so they take turns: while
+        # one runs, the others wait here instead of holding up a worker
+        self.busy = set()
+        self.waiting = defaultdict(deque)
+
+        # kept for the life of the process: one cache, one Letterboxd login
+        self.store = ResolveStore()
+        self._lb = None
+        self._lb_lock = threading.Lock()
+
+    def start(self):
+        for n in range(max(1, self.args.workers)):
+            threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True).start()
+
+    def lb_session(self):
+        from .lb_session import ensure_lb_session
+        with self._lb_lock:
+            if self._lb is None:
+                self._lb = ensure_lb_session(self.args.cookies)
+            return self._lb
+
+    def lookup_client(self):
+        from .batch import lookup_client
+        with self.lock:
+            if self.lookup is None:
+                self.lookup = lookup_client(os.environ.get("TMDB_API_KEY"), list(self.accounts.values()))
+            return self.lookup
+
+    def client(self, account):
+        if account is None:
+            return self.default_client
+        with self.lock:
+            if account not in self.clients:
+                from .batch import account_client
+                self.clients[account] = account_client(
+                    self.accounts[account], os.environ.get("TMDB_API_KEY"),
+                )
+            return self.clients[account]
+
+    # ---- submission ----
+    def job_args(self, mode, path, params):
+        from .cli import build_parser
+
+        args = build_parser().parse_args([mode, str(path)])
+        args.cookies = self.args.cookies
+        for key, value in params.items():
+            key = key.replace("-", "_")
+            if key in FLAGS:
+                setattr(args, key, value.lower() in TRUE)
+            elif key in NUMBERS:
+                try:
+                    setattr(args, key, int(value))
+                except ValueError:
+                    raise ValueError(f"{key} must be an integer, got {value!r}")
+            elif key == "title":
+                args.title = value
+            elif key not in {"mode", "account"}:
+                raise ValueError(f"unknown option {key!r}")
+        return args
+
+    def submit(self, params, body):
+        from .cli import MODES
+
+        mode, account = params.get("mode"), params.get("account")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if account is None and self.default_client is None:
+            raise ValueError("no default account is configured: pass account=NAME")
+        if account is not None and account not in self.accounts:
+            raise ValueError(f"unknown account {account!r}")
+
+        job = Job(mode, account, None)
+        path = JOBS_DIR / f"{job.id}{'.zip' if mode == 'export' else '.csv'}"
+        job.args = self.job_args(mode, path, params)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        return job
+
+    def views(self):
+        with self.lock:
+            return [job.view() for job in self.jobs.values()]
+
+    def _trim(self):
+        with self.lock:
+            finished = [j.id for j in self.jobs.values() if j.finished]
+            for job_id in finished[:max(0, len(finished) - SERVE_KEEP_JOBS)]:
+                del self.jobs[job_id]
+
+    # ---- workers ----
+    def _claim(self, job):
+        with self.lock:
+            if job.account in self.busy:
+                self.waiting[job.account].append(job)
+                return False
+            self.busy.add(job.account)
+            return True
+
+    def _next(self, job):
+        # the account's next waiting job, which this worker runs; else free the account
+        with self.lock:
+            waiting = self.waiting[job.account]
+            if waiting:
+                return waiting.popleft()
+            del self.waiting[job.account]
+            self.busy.discard(job.account)
+            return None
+
+    def _work(self):
+        # each worker keeps its own resolver (async sessions are per event loop)
+        # over the shared store and Letterboxd login
+        from .cli import build_resolver, sync_streams
+        from .progress import on_progress
+        from .workspace import Workspace, DEFAULT_WORKSPACE
+
+        resolver = None
+        while True:
+            job = self.queue.get()
+            if not self._claim(job):
+                continue
+            while job is not None:
+                job.status, job.started = "running", time.time()
+                on_progress(job.progress)
+                try:
+                    client = self.client(job.account)
+                    resolver = resolver or build_resolver(
+                        self.args, self.lookup_client(), store=self.store, connect=self.lb_session,
+                    )
+                    ws = Workspace.for_account(job.account) if job.account else DEFAULT_WORKSPACE
+                    sync_streams(job.args, client, resolver, ws)
+                except Exception as e:
+                    job.finish(e)
+                else:
+                    job.finish()
+                finally:
+                    on_progress(None)
+                    job.args.csv.unlink(missing_ok=True)
+                print(f"[JOB] {job.id} {job.status} {dict(job.counts)}")
+                self._trim()
+                job = self._next(job)
+
+
+# ---------- HTTP API ----------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: Service
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        token = self.service.args.token
+        if not token:
+            return True
+        got = self.headers.get("Authorization", "")
+        if hmac.compare_digest(got.encode(), f"Bearer {token}".encode()):
+            return True
+        self._send(401, {"error": "unauthorized"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        path = urlsplit(self.path).path.rstrip("/")
+
+        if path == "/health":
+            self._send(200, {"ok": True, "queued": self.service.queue.qsize()})
+        elif path == "/metrics":
+            from .metrics import metrics
+            self._send(200, metrics.summary())
+        elif path == "/jobs":
+            self._send(200, {"jobs": self.service.views()})
+        elif path.startswith("/jobs/"):
+            job = self.service.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "no such job"})
+            else:
+                self._send(200, job.view())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send(404, {"error": "not found"})
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send(411, {"error": "Content-Length required"})
+            return
+        if not length.strip().isdecimal():
+            # the body's end is unknown, so the connection can't be reused
+            self.close_connection = True
+            self._send(400, {"error": f"bad Content-Length {length!r}"})
+            return
+        length = int(length)
+        if length > SERVE_MAX_UPLOAD:
+            self.close_connection = True
+            self._send(413, {"error": f"uploads are limited to {SERVE_MAX_UPLOAD} bytes"})
+            return
+
+        body = self.rfile.read(length)
+        try:
+            job = self.service.submit(dict(parse_qsl(url.query)), body)
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(202, dict(job.view(), url=f"/jobs/{job.id}"))
+
+
+def main(argv=None):
+    from .batch import load_manifest
+    from .cli import tmdb_client
+    from .config import DEFAULT_COOKIE_JAR
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    accounts, cookies = {}, DEFAULT_COOKIE_JAR
+    if args.manifest:
+        try:
+            listed, cookies = load_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            parser.error(f"bad manifest: {e}")
+        accounts = {acc["name"]: acc for acc in listed}
+    args.cookies = args.cookies or cookies
+
+    # the account behind TMDB_SESSION_ID / tmdb_session.txt takes jobs without
+    # account=NAME; with a manifest it is optional, so no login prompt at startup
+    default_client = None
+    if not accounts or os.environ.get("TMDB_SESSION_ID") or TMDB_SESSION_FILE.exists():
+        default_client = tmdb_client(parser)
+
+    service = Service(args, default_client, accounts)
+    service.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), type("Handler", (Handler,), {"service": service}))
+    server.daemon_threads = True
+    print(f"[INFO] Listening on http://{args.host}:{server.server_address[1]} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        # finished events are journaled: resubmitting an interrupted export resumes it
+        print("[INFO] Shutting down")
+    finally:
+        server.server_close()
@@ -1,105 +1,263 @@
-import tmdbsimple as tmdb
-import requests
+import copy
 from .util import load_json, save_json
-from .config import LIST_CACHE
+from .tmdb_session import ensure_account_id
+from .config import LIST_CACHE, LIST_BATCH_SIZE, TMDB_ACCOUNT_FILE
 
-API_BASE = "https://api.themoviedb.org/3"
+# list id in planned writes for a list that does not exist yet (see create_list)
+NEW_LIST = "{new}"
 
 class TMDBSink:
-    def __init__(self, session_id, list_meta):
-        self.session_id = session_id
-        self.api_key = tmdb.API_KEY
+    def __init__(
+        self, client, list_meta, batch_size=LIST_BATCH_SIZE, prefetch=False, create_list=True,
+        list_cache=LIST_CACHE, account_file=TMDB_ACCOUNT_FILE,
+    ):
+        self.client = client
+        self.create_list = create_list
+        self.aclient = None
+        self.v4_token = client.v4_token
+        self.batch_size = batch_size
+        self.buffer = []
 
-        self.account = tmdb.Account(session_id)
-        self.account.info()
+        self.account_id = ensure_account_id(client, account_file)
 
-        self.list = None
-        self.cache = load_json(LIST_CACHE, {})
+        self.list_cache = list_cache
+        self.cache = load_json(list_cache, {})
+        self.list_id = self._ensure_list(list_meta)
 
-        if list_meta:
-            key = list_meta.url or list_meta.name
-            self.list = tmdb.Lists(session_id=session_id)
+        self.prefetch = prefetch
+        self._state = None
+        self._base = None  # the sink for_list() copies came from, which owns the account sets
 
-            if key in self.cache:
-                self.list.id = self.cache[key]
+    @property
+    def state(self):
+        # fetched on the first write, so runs that write nothing never pay for it; other
+        # target lists fetch only their own items on top of the account's sets
+        if self._state is None and self.prefetch:
+            if self._base is not None:
+                self._state = self._base.state.for_list(self.client.get, self._remote_list())
             else:
-                resp = self.list.list_create(
-                    name=list_meta.name,
-                    description=list_meta.description or "Imported from Letterboxd",
-                    language="en",
-                )
-                self.list.id = resp["list_id"]
-                self.cache[key] = self.list.id
-                save_json(LIST_CACHE, self.cache)
+                from .account_state import AccountState
+                self._state = AccountState.load(self.client.get, self.account_id, self._remote_list())
+        return self._state
 
-    # ---------- real TMDB rating writer ----------
-    def _set_rating(self, media_type: str, tmdb_id: int, value: float):
-        if not (0.5 <= value <= 10.0):
-            raise ValueError(f"TMDB rating must be 0.5–10.0, got {value}")
+    def _remote_list(self):
+        return None if self.list_id == NEW_LIST else self.list_id
 
-        url = f"{API_BASE}/{media_type}/{tmdb_id}/rating"
-        params = {
-            "api_key": self.api_key,
-            "session_id": self.session_id,
-        }
+    def _ensure_list(self, list_meta):
+        if not list_meta:
+            return None
 
-        resp = requests.post(url, params=params, json={"value": value}, timeout=30)
-        data = resp.json()
+        key = list_meta.url or list_meta.name
+        if key not in self.cache:
+            if not self.create_list:
+                return NEW_LIST
+            resp = self.client.post("list", {
+                "name": list_meta.name,
+                "description": list_meta.description or "Imported from Letterboxd",
+                "language": "en",
+            })
+            self.cache[key] = resp["list_id"]
+            save_json(self.list_cache, self.cache)
+        return self.cache[key]
 
-        if not resp.ok or not data.get("success"):
-            raise RuntimeError(f"TMDB rating failed: {data}")
+    def for_list(self, list_meta):
+        # a sink for another target list on the same account, sharing client and state
+        other = copy.copy(self)
+        other.buffer = []
+        other.aclient = None
+        other.list_id = self._ensure_list(list_meta)
+        other._base = self._base or self
+        other._state = None
+        return other
 
-        return data
+    # ---------- real TMDB writer ----------
+    def _post(self, path: str, body: dict, v4=False):
+        return self.client.post(path, body, v4=v4, check="results" if v4 else "success")
 
-    # ---------- event applier ----------
-    def apply(self, ev):
+    def _rating(self, media_type: str, tmdb_id: int, value: float):
+        if not (0.5 <= value <= 10.0):
+            raise ValueError(f"TMDB rating must be 0.5–10.0, got {value}")
+        return f"{media_type}/{tmdb_id}/rating", {"value": value}
+
+    # ---------- event -> TMDB writes ----------
+    def _writes(self, ev):
         if not ev.tmdb_id or not ev.media_type:
             raise ValueError("TMDBSink.apply() called with missing tmdb_id or media_type")
 
         mt = ev.media_type  # "movie" or "tv"
+        key = (mt, ev.tmdb_id)
+        st = self.state
 
         # ---- Lists (media-agnostic, incl IMDb) ----
         if ev.kind == "list":
-            if not self.list:
+            if self.list_id is None:
                 raise RuntimeError("List event received but no TMDB list is configured")
 
-            self.list.add_item(media_id=ev.tmdb_id, media_type=mt)
+            writes = []
+            if not (st and key in st.list_items):
+                writes.append(
+                    (f"list/{self.list_id}/add_item", {"media_id": ev.tmdb_id, "media_type": mt})
+                )
 
             # Optional rating
             if ev.payload and ev.payload.get("rating") is not None:
                 # payload.rating is already in TMDB scale (0.5–10)
-                self._set_rating(mt, ev.tmdb_id, float(ev.payload["rating"]))
-            return
+                value = float(ev.payload["rating"])
+                write = self._rating(mt, ev.tmdb_id, value)
+                if not (st and st.rated.get(key) == value):
+                    writes.append(write)
+            return writes
 
         # ---- Watchlist ----
         if ev.kind == "watchlist":
-            self.account.watchlist(
-                media_type=mt,
-                media_id=ev.tmdb_id,
-                watchlist=True,
-            )
-            return
+            if st and key in st.watchlist:
+                return []
+            return [(
+                f"account/{self.account_id}/watchlist",
+                {"media_type": mt, "media_id": ev.tmdb_id, "watchlist": True},
+            )]
 
         # ---- Watched (synthetic list) ----
         if ev.kind == "watched":
-            if not self.list:
+            if self.list_id is None:
                 raise RuntimeError("Watched event received but no TMDB list is configured")
-            self.list.add_item(media_id=ev.tmdb_id)
-            return
+            if st and key in st.list_items:
+                return []
+            return [(f"list/{self.list_id}/add_item", {"media_id": ev.tmdb_id})]
 
         # ---- Favorites / Likes ----
         if ev.kind == "like":
-            self.account.favorite(
-                media_type=mt,
-                media_id=ev.tmdb_id,
-                favorite=True,
-            )
-            return
+            if st and key in st.favorites:
+                return []
+            return [(
+                f"account/{self.account_id}/favorite",
+                {"media_type": mt, "media_id": ev.tmdb_id, "favorite": True},
+            )]
 
         # ---- Ratings ----
         if ev.kind == "rating":
-            # already converted to TMDB scale in sink earlier
-            self._set_rating(mt, ev.tmdb_id, float(ev.payload["rating"]))
-            return
+            # already converted to TMDB scale in parse_events
+            value = float(ev.payload["rating"])
+            write = self._rating(mt, ev.tmdb_id, value)
+            if st and st.rated.get(key) == value:
+                return []
+            return [write]
 
         raise ValueError(f"Unhandled event kind: {ev.kind}")
+
+    def planned_writes(self, ev):
+        # the diff against account state, without sending anything
+        return self._writes(ev)
+
+    def _applied(self, ev):
+        if self.state:
+            self.state.mark(ev)
+
+    # ---------- event applier ----------
+    def apply(self, ev):
+        # returns the number of writes made; 0 means the account already matched
+        writes = self._writes(ev)
+        for path, body in writes:
+            self._post(path, body)
+        self._applied(ev)
+        return len(writes)
+
+    async def _apost(self, path, body, v4=False):
+        if self.aclient is None:
+            self.aclient = self.client.asynchronous()
+        return await self.aclient.post(path, body, v4=v4, check="results" if v4 else "success")
+
+    async def aapply(self, ev):
+        writes = self._writes(ev)
+        for path, body in writes:
+            await self._apost(path, body)
+        self._applied(ev)
+        return len(writes)
+
+    # ---------- batched list writes (TMDB v4 bulk add) ----------
+    def batches(self, ev):
+        if not (self.v4_token and self.list_id and ev.kind in {"list", "watched"}):
+            return False
+        # items already on the list only need their rating, which is not bulk-able
+        return not (self.state and (ev.media_type, ev.tmdb_id) in self.state.list_items)
+
+    def enqueue(self, ticket, ev):
+        # validate up front so a bad row fails on its own, not with its chunk
+        self._writes(ev)
+        self.buffer.append((ticket, ev))
+        if len(self.buffer) >= self.batch_size:
+            return self.drain()
+        return None
+
+    def drain(self):
+        chunk, self.buffer = self.buffer, []
+        return chunk
+
+    def _bulk_body(self, chunk):
+        return {"items": [{"media_type": ev.media_type, "media_id": ev.tmdb_id} for _, ev in chunk]}
+
+    def _bulk_results(self, chunk, data):
+        status = {
+            (r.get("media_type"), r.get("media_id")): r
+            for r in data.get("results") or []
+        }
+
+        for ticket, ev in chunk:
+            r = status.get((ev.media_type, ev.tmdb_id))
+            if r is None:
+                yield ticket, ev, RuntimeError(f"TMDB bulk add did not report {ev.media_type}/{ev.tmdb_id}")
+            elif r.get("success") or "taken" in str(r.get("error", "")):
+                # "already taken" means the item is on the list: the write is in effect
+                yield ticket, ev, None
+            else:
+                # TMDB turned this item down (bad id, bad media type): trying again won't help
+                yield ticket, ev, ValueError(f"TMDB bulk add failed: {r}")
+
+    def _followups(self, ev):
+        # the writes left once the bulk add has put the item on the list
+        return [w for w in self._writes(ev) if not w[0].endswith("/add_item")]
+
+    def write_chunk(self, chunk):
+        if not chunk:
+            return []
+        try:
+            data = self._post(f"list/{self.list_id}/items", self._bulk_body(chunk), v4=True)
+        except Exception as e:
+            return [(ticket, e) for ticket, _ in chunk]
+
+        out = []
+        for ticket, ev, err in self._bulk_results(chunk, data):
+            if err is None:
+                try:
+                    for path, body in self._followups(ev):
+                        self._post(path, body)
+                    self._applied(ev)
+                except Exception as e:
+                    err = e
+            out.append((ticket, err))
+        return out
+
+    async def awrite_chunk(self, chunk):
+        if not chunk:
+            return []
+        try:
+            data = await self._apost(f"list/{self.list_id}/items", self._bulk_body(chunk), v4=True)
+        except Exception as e:
+            return [(ticket, e) for ticket, _ in chunk]
+
+        out = []
+        for ticket, ev, err in self._bulk_results(chunk, data):
+            if err is None:
+                try:
+                    for path, body in self._followups(ev):
+                        await self._apost(path, body)
+                    self._applied(ev)
+                except Exception as e:
+                    err = e
+            out.append((ticket, err))
+        return out
+
+    async def aclose(self):
+        if self.aclient is not None:
+            await self.aclient.aclose()
+            self.aclient = None
@@ -0,0 +1,64 @@
+import gzip
+import json
+import time
+from .util import load_json, save_json
+from .config import LIST_CACHE, SNAPSHOT_VERSION
+
+# gzip'd JSON lines: one header object, then ["r", key, status, tmdb_id, media_type, ts],
+# ["a", alias, key] and ["l", list_key, list_id] records
+SNAPSHOT_FORMAT = "tmdb-imp-cache"
+
+
+def export_snapshot(store, path, list_cache=LIST_CACHE):
+    rows, aliases = store.dump()
+    lists = load_json(list_cache, {})
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": time.time(),
+        "counts": {"resolutions": len(rows), "aliases": len(aliases), "lists": len(lists)},
+    }
+
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for row in rows:
+            f.write(json.dumps(["r", *row]) + "\n")
+        for alias in aliases:
+            f.write(json.dumps(["a", *alias]) + "\n")
+        for key, list_id in sorted(lists.items()):
+            f.write(json.dumps(["l", key, list_id]) + "\n")
+    tmp.replace(path)
+    return header["counts"]
+
+
+def import_snapshot(store, path, list_cache=LIST_CACHE):
+    rows, aliases, lists = [], [], {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not a tmdb-imp cache snapshot")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{path} is snapshot version {header['version']}; "
+                f"this tmdb-imp reads up to {SNAPSHOT_VERSION}"
+            )
+
+        for line in f:
+            rec = json.loads(line)
+            if rec[0] == "r":
+                rows.append(rec[1:])
+            elif rec[0] == "a":
+                aliases.append(rec[1:])
+            elif rec[0] == "l":
+                lists[rec[1]] = rec[2]
+
+    merged, linked = store.merge(rows, aliases)
+
+    # list IDs already known here win: they point at lists this account created
+    local = load_json(list_cache, {})
+    added = {k: v for k, v in lists.items() if k not in local}
+    if added:
+        save_json(list_cache, {**local, **added})
+
+    return {"resolutions": merged, "aliases": linked, "lists": len(added)}
@@ -0,0 +1,282 @@
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from .metrics import metrics
+from .config import (
+    RESOLVE_DB, RESOLVE_CACHE, STORE_COMMIT_EVERY, STORE_COMMIT_INTERVAL,
+    CACHE_TTL, ERROR_BACKOFF_BASE, ERROR_BACKOFF_MAX,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolutions (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    tmdb_id INTEGER,
+    media_type TEXT,
+    ts REAL NOT NULL,
+    fails INTEGER NOT NULL DEFAULT 0,
+    next_try REAL
+) WITHOUT ROWID
+"""
+
+# alternate spellings of a film URL (short links, review pages) -> its resolutions key
+ALIAS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+
+AGE_DAYS = (1, 7, 30, 180, 365)
+
+
+def _stale(status, ts, next_try, now, ttl):
+    if next_try and next_try > now:
+        return False
+    limit = ttl.get(status)
+    return limit is not None and now - ts >= limit
+
+
+def is_fresh(row, now=None, ttl=CACHE_TTL):
+    # a row answers lookups while it is inside its TTL or its failure backoff window
+    now = time.time() if now is None else now
+    if row["next_try"] and row["next_try"] > now:
+        return True
+    if row["status"] == "error":
+        return False
+    return not _stale(row["status"], row["ts"], row["next_try"], now, ttl)
+
+
+class ResolveStore:
+    def __init__(self, path=RESOLVE_DB, legacy=RESOLVE_CACHE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(SCHEMA)
+        self.db.execute(ALIAS_SCHEMA)
+        self._upgrade()
+        self.db.commit()
+
+        if legacy and legacy.exists():
+            self._migrate(legacy)
+
+        atexit.register(self.close)
+
+    def _upgrade(self):
+        # caches written before backoff tracking lack these columns
+        cols = {row[1] for row in self.db.execute("PRAGMA table_info(resolutions)")}
+        if "fails" not in cols:
+            self.db.execute("ALTER TABLE resolutions ADD COLUMN fails INTEGER NOT NULL DEFAULT 0")
+        if "next_try" not in cols:
+            self.db.execute("ALTER TABLE resolutions ADD COLUMN next_try REAL")
+
+    # ---- one-off import of the old whole-file JSON cache ----
+    def _migrate(self, legacy):
+        try:
+            data = json.loads(legacy.read_text())
+        except Exception:
+            return
+
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO resolutions (key, status, tmdb_id, media_type, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (k, v["status"], v.get("tmdb_id"), v.get("media_type"), v.get("ts") or 0.0)
+                    for k, v in data.items()
+                    if isinstance(v, dict) and v.get("status")
+                ),
+            )
+            self.db.commit()
+        legacy.replace(legacy.with_suffix(".json.migrated"))
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT status, tmdb_id, media_type, ts, fails, next_try "
+                "FROM resolutions WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "status": row[0], "tmdb_id": row[1], "media_type": row[2],
+            "ts": row[3], "fails": row[4], "next_try": row[5],
+        }
+
+    def put(self, key, status, tmdb_id=None, media_type=None):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO resolutions (key, status, tmdb_id, media_type, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, status, tmdb_id, media_type, time.time()),
+            )
+            self._bump()
+
+    def fail(self, key, base=ERROR_BACKOFF_BASE, cap=ERROR_BACKOFF_MAX):
+        # keep any earlier answer, just count the failure and push back the next try
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT fails FROM resolutions WHERE key = ?", (key,),
+            ).fetchone()
+            fails = (row[0] if row else 0) + 1
+            next_try = now + min(cap, base * 2 ** (fails - 1))
+            if row:
+                self.db.execute(
+                    "UPDATE resolutions SET fails = ?, next_try = ? WHERE key = ?",
+                    (fails, next_try, key),
+                )
+            else:
+                self.db.execute(
+                    "INSERT INTO resolutions (key, status, ts, fails, next_try) "
+                    "VALUES (?, 'error', ?, ?, ?)",
+                    (key, now, fails, next_try),
+                )
+            self._bump()
+        return next_try
+
+    def canonical(self, alias):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT key FROM aliases WHERE alias = ?", (alias,),
+            ).fetchone()
+        return row[0] if row else alias
+
+    def alias(self, alias, key):
+        if alias == key:
+            return
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (alias, key))
+            self._bump()
+
+    def clear_backoff(self, key):
+        # make the next lookup refetch now; the fail count is kept for later backoffs
+        with self.lock:
+            self.db.execute("UPDATE resolutions SET next_try = NULL WHERE key = ?", (key,))
+            self._bump()
+
+    def _bump(self):
+        self.pending += 1
+        if (
+            self.pending >= STORE_COMMIT_EVERY
+            or time.monotonic() - self.last_commit >= STORE_COMMIT_INTERVAL
+        ):
+            self._commit()
+
+    def _commit(self):
+        with metrics.timer("store_commit"):
+            self.db.commit()
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def flush(self):
+        with self.lock:
+            if self.db is not None and self.pending:
+                self._commit()
+
+    def close(self):
+        with self.lock:
+            if self.db is None:
+                return
+            self._commit()
+            self.db.close()
+            self.db = None
+
+    # ---- freshness: reporting and eviction for `cache stats` / `cache prune` ----
+    def stats(self, ttl=CACHE_TTL):
+        now = time.time()
+        by_status = {}
+        with self.lock:
+            rows = self.db.execute("SELECT status, ts, next_try FROM resolutions")
+            for status, ts, next_try in rows:
+                s = by_status.setdefault(status, {
+                    "rows": 0, "stale": 0, "backing_off": 0,
+                    "age_days": dict.fromkeys([f"<{d}" for d in AGE_DAYS] + [f">={AGE_DAYS[-1]}"], 0),
+                })
+                age = now - ts
+                s["rows"] += 1
+                s["stale"] += _stale(status, ts, next_try, now, ttl)
+                s["backing_off"] += bool(next_try and next_try > now)
+                s["age_days"][next(
+                    (f"<{d}" for d in AGE_DAYS if age < d * 86400), f">={AGE_DAYS[-1]}"
+                )] += 1
+            aliases = self.db.execute("SELECT COUNT(*) FROM aliases").fetchone()[0]
+
+        size = sum(p.stat().st_size for p in self._files() if p.exists())
+        return {
+            "path": str(self.path),
+            "bytes": size,
+            "rows": sum(s["rows"] for s in by_status.values()),
+            "aliases": aliases,
+            "by_status": by_status,
+        }
+
+    def prune(self, ttl=CACHE_TTL, dry_run=False):
+        # evict rows past their TTL, unless a backoff window still needs their fail count
+        now = time.time()
+        with self.lock:
+            stale = [
+                (key, status) for key, status, ts, next_try in
+                self.db.execute("SELECT key, status, ts, next_try FROM resolutions")
+                if _stale(status, ts, next_try, now, ttl)
+            ]
+            if not dry_run:
+                self.db.executemany("DELETE FROM resolutions WHERE key = ?", ((k,) for k, _ in stale))
+                self.db.execute(
+                    "DELETE FROM aliases WHERE key NOT IN (SELECT key FROM resolutions)"
+                )
+                self._commit()
+
+        removed = {}
+        for _, status in stale:
+            removed[status] = removed.get(status, 0) + 1
+        return removed
+
+    # ---- snapshots: portable rows for `cache export` / `cache import` ----
+    def dump(self):
+        # errors and their backoff are local to the machine that saw them
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT key, status, tmdb_id, media_type, ts FROM resolutions "
+                "WHERE status != 'error' ORDER BY key"
+            ).fetchall()
+            aliases = self.db.execute("SELECT alias, key FROM aliases ORDER BY alias").fetchall()
+        return rows, aliases
+
+    def merge(self, rows, aliases):
+        # newest answer wins per key, and any answer beats a local failure; merging the
+        # same snapshot twice changes nothing
+        with self.lock:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT INTO resolutions (key, status, tmdb_id, media_type, ts) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "status = excluded.status, tmdb_id = excluded.tmdb_id, "
+                "media_type = excluded.media_type, ts = excluded.ts, fails = 0, next_try = NULL "
+                "WHERE excluded.ts > resolutions.ts "
+                "OR (resolutions.status = 'error' AND excluded.status != 'error')",
+                rows,
+            )
+            merged = self.db.total_changes - before
+            self.db.executemany("INSERT OR IGNORE INTO aliases VALUES (?, ?)", aliases)
+            linked = self.db.total_changes - before - merged
+            self._commit()
+        return merged, linked
+
+    def _files(self):
+        return [self.path, self.path.with_name(self.path.name + "-wal")]
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM resolutions").fetchone()[0]
@@ -0,0 +1,68 @@
+import struct
+import hashlib
+from .config import SYNC_DIR
+
+# per input file, the rows already imported: sorted (key hash, row hash) pairs,
+# 8 bytes each. The key is the film column, so an edited row (a new rating for the
+# same film) can be told apart from a new one and from one that disappeared.
+PAIR = struct.Struct("<8s8s")
+KEY_COLUMNS = ("Letterboxd URI", "URL", "Const")
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def row_pair(row):
+    key = next((row[c] for c in KEY_COLUMNS if row.get(c)), "")
+    body = "\x1f".join(f"{k}={v}" for k, v in sorted(row.items(), key=lambda kv: str(kv[0])))
+    return _digest(key), _digest(body)
+
+
+def stream_key(mode, list_meta):
+    # stable across weekly exports: the list URL for lists, the mode for everything else
+    name = f"{mode}:{list_meta.url}" if list_meta else mode
+    return hashlib.blake2b(name.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class Fingerprint:
+    def __init__(self, mode, list_meta, root=SYNC_DIR):
+        self.path = root / f"{stream_key(mode, list_meta)}.fp"
+        self.kept = set()  # unchanged pairs, carried over as-is
+        self.delta = []  # (pair, row) to import this run
+        self.counts = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+
+    def _load(self):
+        if not self.path.exists():
+            return set()
+        data = self.path.read_bytes()
+        return set(PAIR.iter_unpack(data[:len(data) - len(data) % PAIR.size]))
+
+    def diff(self, rows, full=False):
+        old = set() if full else self._load()
+        old_keys = {kh for kh, _ in old}
+        keys = set()
+
+        for row in rows:
+            pair = row_pair(row)
+            keys.add(pair[0])
+            if pair in old:
+                self.kept.add(pair)
+                self.counts["unchanged"] += 1
+                continue
+            self.counts["changed" if pair[0] in old_keys else "new"] += 1
+            self.delta.append((pair, row))
+
+        self.counts["removed"] = len(old_keys - keys)
+        return self
+
+    def rows(self):
+        return (row for _, row in self.delta)
+
+    def save(self, imported):
+        # `imported`: one flag per delta row; rows that failed are diffed again next run
+        pairs = self.kept | {pair for (pair, _), ok in zip(self.delta, imported) if ok}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(PAIR.pack(*p) for p in sorted(pairs)))
+        tmp.replace(self.path)
@@ -0,0 +1,125 @@
+import threading
+from .ratelimit import limiter
+from .config import TMDB_API_ROOT, TMDB_POOL_SIZE, TMDB_TIMEOUT
+
+API_BASE = f"{TMDB_API_ROOT}/3"
+API_BASE_V4 = f"{TMDB_API_ROOT}/4"
+
+# One keep-alive pool per process for every TMDB call. curl negotiates HTTP/2
+# over TLS, and the sync session hands each thread its own reusable handle; with
+# no pool of its own to size, it is held to TMDB_POOL_SIZE requests in flight
+# across threads, as the async session is by max_clients.
+_session = None
+_sync_slots = threading.BoundedSemaphore(TMDB_POOL_SIZE)
+_async_sessions = {}
+
+
+def shared_session():
+    global _session
+    if _session is None:
+        from curl_cffi.requests import Session
+        _session = Session(timeout=TMDB_TIMEOUT)
+    return _session
+
+
+def shared_async_session():
+    # AsyncSession is bound to the loop it was created on
+    import asyncio
+    from curl_cffi.requests import AsyncSession
+
+    loop = asyncio.get_running_loop()
+    s = _async_sessions.get(loop)
+    if s is None:
+        s = _async_sessions[loop] = AsyncSession(max_clients=TMDB_POOL_SIZE, timeout=TMDB_TIMEOUT)
+    return s
+
+
+async def close_async_session():
+    import asyncio
+    s = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if s is not None:
+        await s.close()
+
+
+class TMDBError(RuntimeError):
+    def __init__(self, method, path, status, data):
+        super().__init__(f"TMDB {method} /{path} failed ({status}): {data}")
+        self.status = status
+        self.data = data
+
+
+class _Credentials:
+    def __init__(self, api_key, session_id=None, v4_token=None):
+        self.api_key = api_key
+        self.session_id = session_id
+        self.v4_token = v4_token
+
+    def _prepare(self, path, params, v4):
+        if v4:
+            return f"{API_BASE_V4}/{path}", params, {"Authorization": f"Bearer {self.v4_token}"}
+
+        params = dict(params or {})
+        params["api_key"] = self.api_key
+        if self.session_id:
+            params["session_id"] = self.session_id
+        return f"{API_BASE}/{path}", params, None
+
+    def _result(self, method, path, resp, check):
+        try:
+            data = resp.json()
+        except ValueError:
+            # gateways and CDNs answer 502/504 with HTML; keep the status so the
+            # failure is classified (and retried) by it rather than as bad JSON
+            raise TMDBError(method, path, resp.status_code, resp.text[:200])
+        # check=True: the HTTP status; "success": that and the write's success flag;
+        # "results": bulk writes, whose per-item outcomes the caller sorts out, unless
+        # the body has none (bad token, bad list) and so failed as a whole
+        if check == "results":
+            failed = not data.get("success") and not data.get("results")
+        elif check == "success":
+            failed = not resp.ok or not data.get("success")
+        else:
+            failed = check and not resp.ok
+        if failed:
+            raise TMDBError(method, path, resp.status_code, data)
+        return data
+
+
+class TMDBClient(_Credentials):
+    def request(self, method, path, params=None, json=None, v4=False, check=True):
+        url, params, headers = self._prepare(path, params, v4)
+
+        def send():
+            with _sync_slots:
+                return shared_session().request(method, url, params=params, json=json, headers=headers)
+
+        resp = limiter.call(url, send)
+        return self._result(method, path, resp, check)
+
+    def get(self, path, **params):
+        return self.request("GET", path, params=params)
+
+    def post(self, path, body, v4=False, check=True):
+        return self.request("POST", path, json=body, v4=v4, check=check)
+
+    def asynchronous(self):
+        return AsyncTMDBClient(self.api_key, self.session_id, self.v4_token)
+
+
+class AsyncTMDBClient(_Credentials):
+    async def request(self, method, path, params=None, json=None, v4=False, check=True):
+        url, params, headers = self._prepare(path, params, v4)
+        session = shared_async_session()
+        resp = await limiter.acall(url, lambda: session.request(
+            method, url, params=params, json=json, headers=headers,
+        ))
+        return self._result(method, path, resp, check)
+
+    async def get(self, path, **params):
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path, body, v4=False, check=True):
+        return await self.request("POST", path, json=body, v4=v4, check=check)
+
+    async def aclose(self):
+        await close_async_session()
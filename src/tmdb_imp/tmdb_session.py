@@ -1,19 +1,39 @@
 import os
+import hashlib
 import webbrowser
-import tmdbsimple as tmdb
-from .config import TMDB_SESSION_FILE
+from .util import load_json, save_json
+from .config import TMDB_SESSION_FILE, TMDB_ACCOUNT_FILE
 
-def ensure_tmdb_session():
+def ensure_tmdb_session(client):
     if os.environ.get("TMDB_SESSION_ID"):
         return os.environ["TMDB_SESSION_ID"]
 
     if TMDB_SESSION_FILE.exists():
         return TMDB_SESSION_FILE.read_text().strip()
 
-    auth = tmdb.Authentication()
-    token = auth.token_new()["request_token"]
+    token = client.get("authentication/token/new")["request_token"]
     webbrowser.open(f"https://www.themoviedb.org/authenticate/{token}")
     input("Approve TMDB access, then press ENTER...")
-    sid = auth.session_new(request_token=token)["session_id"]
+    sid = client.post("authentication/session/new", {"request_token": token})["session_id"]
     TMDB_SESSION_FILE.write_text(sid)
     return sid
+
+
+def _session_tag(session_id):
+    # tells sessions apart without keeping the secret on disk
+    return hashlib.sha256((session_id or "").encode()).hexdigest()[:16]
+
+
+def ensure_account_id(client, path=TMDB_ACCOUNT_FILE):
+    # the account behind a session never changes: ask TMDB once per session
+    cached = load_json(path, {})
+    tag = _session_tag(client.session_id)
+    if cached.get("session") == tag and cached.get("id"):
+        return cached["id"]
+
+    if cached.get("session_id") == client.session_id and cached.get("id"):
+        account_id = cached["id"]  # older files kept the session ID itself: rewrite them
+    else:
+        account_id = client.get("account")["id"]
+    save_json(path, {"session": tag, "id": account_id})
+    return account_id
@@ -16,6 +16,7 @@ def load_json(path: Path, default):
     return default
 
 def save_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(".tmp")
     tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False))
     tmp.replace(path)
@@ -0,0 +1,40 @@
+from pathlib import Path
+from .config import (
+    CACHE_DIR,
+    ACCOUNTS_DIR,
+    PROGRESS_LOG,
+    PROGRESS_INDEX,
+    ERROR_LOG,
+    LIST_CACHE,
+    SYNC_DIR,
+    TMDB_ACCOUNT_FILE,
+)
+
+
+class Workspace:
+    # where one TMDB account keeps its own state: progress, errors, list IDs and sync
+    # fingerprints. The resolution cache is not in here; it is the same for everyone.
+    def __init__(self, root=CACHE_DIR, account_file=TMDB_ACCOUNT_FILE):
+        root = Path(root)
+        self.root = root
+        self.progress_log = root / PROGRESS_LOG.name
+        self.progress_index = root / PROGRESS_INDEX.name
+        self.errors = root / ERROR_LOG.name
+        self.list_cache = root / LIST_CACHE.name
+        self.sync_dir = root / SYNC_DIR.name
+        self.account_file = account_file
+
+    @classmethod
+    def for_account(cls, name):
+        root = ACCOUNTS_DIR / name
+        return cls(root, account_file=root / TMDB_ACCOUNT_FILE.name)
+
+    def journal(self, target=None):
+        from .progress import ProgressJournal
+        return ProgressJournal(self.progress_log, self.progress_index, self.errors, target=target)
+
+    def sink_kwargs(self):
+        return {"list_cache": self.list_cache, "account_file": self.account_file}
+
+
+DEFAULT_WORKSPACE = Workspace()
@@ -0,0 +1,11 @@
+from tmdb_imp.batch import lookup_client
+
+
+def test_lookups_run_under_the_shared_key(capsys):
+    accounts = [{"name": "alice", "api_key": "alice-key"}, {"name": "bob", "api_key": "bob-key"}]
+    shared = lookup_client("shared-key", accounts)
+    assert (shared.api_key, shared.session_id) == ("shared-key", None)
+
+    fallback = lookup_client(None, accounts)
+    assert fallback.api_key == "alice-key"
+    assert "alice's API key" in capsys.readouterr().out
@@ -0,0 +1,81 @@
+from tmdb_imp.coalesce import coalesce
+from tmdb_imp.models import LBEvent
+
+
+def ev(kind, tmdb_id, date="", **payload):
+    return LBEvent(kind, date, f"https://letterboxd.com/film/f{tmdb_id}/", payload,
+                   tmdb_id=tmdb_id, media_type="movie")
+
+
+def test_latest_rating_by_date_wins():
+    first = ev("rating", 1, "2024-01-01", rating=6.0)
+    latest = ev("rating", 1, "2024-06-01", rating=10.0)
+    middle = ev("rating", 1, "2024-03-01", rating=8.0)
+
+    winners, dropped = coalesce([first, latest, middle])
+    assert winners == [latest]
+    assert {id(e) for e in dropped} == {id(first), id(middle)}
+
+
+def test_rating_tie_goes_to_the_later_row():
+    a = ev("rating", 1, "2024-01-01", rating=6.0)
+    b = ev("rating", 1, "2024-01-01", rating=8.0)
+    assert coalesce([a, b]) == ([b], [a])
+
+
+def test_repeated_adds_keep_the_first_and_input_order():
+    events = [
+        ev("watchlist", 1), ev("list", 2, position="1"), ev("watchlist", 1),
+        ev("watched", 2), ev("like", 3), ev("rating", 1, "2024-01-01", rating=6.0),
+    ]
+    winners, dropped = coalesce(events)
+
+    assert winners == [events[0], events[1], events[3], events[4], events[5]]
+    assert dropped == [events[2]]
+
+
+def test_rated_list_rows_keep_the_latest_rating():
+    # imdb-list rows are list events carrying a rating; a rating never gives way to a list add
+    first = ev("list", 1, "2023-01-01", rating=6.0, source="imdb")
+    unrated = ev("list", 1, "2024-01-01", rating=None, source="imdb")
+    latest = ev("list", 1, "2024-06-01", rating=8.0, source="imdb")
+    rating = ev("rating", 1, "2022-01-01", rating=4.0)
+
+    winners, dropped = coalesce([first, rating, unrated, latest])
+    assert winners == [rating, latest]
+    assert {id(e) for e in dropped} == {id(first), id(unrated)}
+
+
+def test_same_film_different_media_type_is_kept():
+    movie = ev("watchlist", 1)
+    tv = LBEvent("watchlist", "", "tt1", {}, tmdb_id=1, media_type="tv")
+    assert coalesce([movie, tv]) == ([movie, tv], [])
+
+
+class FoundResolver:
+    def resolve(self, url):
+        from tmdb_imp.models import ResolveResult, ResolveStatus
+        return ResolveResult(ResolveStatus.FOUND, int(url.rstrip("/")[-1]), "movie")
+
+    def close(self):
+        pass
+
+
+def test_dropped_events_are_journaled_as_done(tmp_path):
+    from tmdb_imp.coalesce import coalesced
+    from tmdb_imp.pipeline import event_id, run
+    from tmdb_imp.progress import ProgressJournal
+
+    events = [
+        LBEvent("rating", "2024-01-01", "https://letterboxd.com/film/f1/", {"rating": 6.0}),
+        LBEvent("rating", "2024-06-01", "https://letterboxd.com/film/f1/", {"rating": 10.0}),
+    ]
+    journal = ProgressJournal(tmp_path / "p.jsonl", tmp_path / "p.idx", tmp_path / "e.jsonl")
+    winners, total = coalesced(iter(events), journal, lambda seen: run(
+        seen, FoundResolver(), None, dry_run=True, journal=journal, total=2,
+    ))
+
+    assert total == 1
+    assert [w.payload["rating"] for w in winners] == [10.0]
+    assert journal.is_done(event_id(events[0]), events[0])
+    assert not journal.is_done(event_id(events[1]), events[1])
@@ -0,0 +1,47 @@
+import zipfile
+
+import pytest
+
+from tmdb_imp import export_zip
+from tmdb_imp.export_zip import export_streams
+
+RATINGS = "Date,Name,Year,Letterboxd URI,Rating\n" + "".join(
+    f"2024-01-{n:02d},Film {n},2000,https://boxd.it/{n},4\n" for n in range(1, 11)
+)
+LIST = (
+    "Letterboxd list export v7\n"
+    "Date,Name,Tags,URL,Description\n"
+    "2024-02-01,Faves,,https://letterboxd.com/me/list/faves/,\n"
+    "\n"
+    "Position,Name,Year,URL,Description\n"
+    "1,Alien,1979,https://letterboxd.com/film/alien/,\n"
+    "2,Heat,1995,https://letterboxd.com/film/heat-1995/,\n"
+)
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "export.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ratings.csv", RATINGS)
+        z.writestr("lists/faves.csv", LIST)
+        z.writestr("deleted/ratings.csv", RATINGS)
+        z.writestr("profile.csv", "Username\nme\n")
+    return path
+
+
+def read(path):
+    return [(name, mode, meta and meta.name, len(list(rows)), total)
+            for name, mode, meta, rows, total in export_streams(path)]
+
+
+def test_streams_with_totals(export):
+    assert read(export) == [
+        ("ratings.csv", "ratings", None, 10, 10),
+        ("lists/faves.csv", "list", "Faves", 2, 2),
+    ]
+
+
+def test_big_files_stream_with_unknown_total(export, monkeypatch):
+    monkeypatch.setattr(export_zip, "EXPORT_BUFFER_MAX", 0)
+    assert [(rows, total) for *_, rows, total in read(export)] == [(10, None), (2, None)]
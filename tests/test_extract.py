@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+
+from tmdb_imp.extract import FOOTER_CLOSE, FooterScanner, scan, tmdb_link, tmdb_link_from_html
+
+# film pages in Letterboxd's markup, trimmed: the footer sits between the cast
+# list and the similar films and reviews that make up most of a real page
+PAGES = Path(__file__).parent / "fixtures" / "letterboxd"
+EXPECTED = {
+    "alien.html": (("movie", 348), "tt0078748"),
+    "chernobyl.html": (("tv", 87108), "tt7366338"),
+    "no-tmdb.html": (None, "tt0011000"),
+}
+
+
+def chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+@pytest.mark.parametrize("size", [1, 7, 100, 511, 4096, 1 << 20])
+def test_scanner_finds_footer_in_any_chunking(name, size):
+    data = (PAGES / name).read_bytes()
+    link, imdb_id = EXPECTED[name]
+
+    page = scan(chunks(data, size))
+    assert page.footer is not None
+    assert page.tmdb_link() == link
+    assert page.imdb_id() == imdb_id
+    assert tmdb_link(page) == tmdb_link_from_html(data.decode()) == link
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_every_split_of_the_footer(name):
+    # two chunks, split at each byte from the opening tag to just past </p>
+    data = (PAGES / name).read_bytes()
+    start = data.index(b'<p class="text-link text-footer">')
+    end = data.index(FOOTER_CLOSE, start) + len(FOOTER_CLOSE)
+
+    for cut in range(start, end + 1):
+        page = scan([data[:cut], data[cut:]])
+        assert page.tmdb_link() == EXPECTED[name][0], cut
+
+
+def test_scanner_stops_reading_after_the_footer():
+    data = (PAGES / "alien.html").read_bytes()
+    s = FooterScanner()
+    fed = 0
+    for chunk in chunks(data, 1024):
+        fed += len(chunk)
+        if s.feed(chunk):
+            break
+    assert fed < len(data) // 2
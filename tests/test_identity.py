@@ -0,0 +1,25 @@
+import pytest
+
+from tmdb_imp.identity import canonical_url
+
+
+@pytest.mark.parametrize("url", [
+    "https://letterboxd.com/film/heat-1995/",
+    "http://letterboxd.com/film/heat-1995",
+    "https://www.letterboxd.com/film/Heat-1995/",
+    "https://letterboxd.com/someone/film/heat-1995/",
+    "https://letterboxd.com/someone/film/heat-1995/reviews/?page=2",
+    "https://letterboxd.com/film/heat-1995/?utm_source=x",
+])
+def test_film_urls_share_one_key(url):
+    assert canonical_url(url) == "https://letterboxd.com/film/heat-1995"
+
+
+def test_short_links_keep_their_path():
+    assert canonical_url("https://boxd.it/abc1/") == "https://boxd.it/abc1"
+
+
+def test_other_hosts_keep_scheme_and_port():
+    assert canonical_url("http://127.0.0.1:8000/film/f1/", hosts=("letterboxd.com",)) == (
+        "http://127.0.0.1:8000/film/f1"
+    )
@@ -0,0 +1,50 @@
+import pytest
+
+from tmdb_imp.imdb_index import IMDbIndex, build_index, read_dump
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = tmp_path / "imdb_index.bin"
+    rows = [("tt0111161", 278, "movie"), ("tt0903747", "1396", "tv"), ("tt0000001", 7, "movie")]
+    assert build_index(iter(rows), path) == (3, 0)
+    return path
+
+
+def test_lookup_hits_and_misses(index_path):
+    index = IMDbIndex(index_path)
+    assert len(index) == 3
+    assert index.get("tt0111161") == (278, "movie")
+    assert index.get("tt0903747") == (1396, "tv")
+    assert index.get("tt0000001") == (7, "movie")
+    assert index.get("tt0000002") is None
+    assert index.get("nm0000001") is None
+    index.close()
+
+
+def test_later_rows_win_and_bad_rows_are_skipped(tmp_path):
+    path = tmp_path / "i.bin"
+    rows = [("tt1", 1, "movie"), ("tt1", 2, "tv"), ("x", 3, "movie"), ("tt2", "?", "movie"), ("tt3", 4, "short")]
+    assert build_index(iter(rows), path) == (1, 3)
+    assert IMDbIndex(path).get("tt1") == (2, "tv")
+
+
+def test_dumps_in_csv_tsv_and_json_lines(tmp_path):
+    (tmp_path / "a.csv").write_text("imdb_id,tmdb_id,media_type\ntt1,1,movie\n")
+    (tmp_path / "b.tsv").write_text("tt2\t2\ttv\n")
+    (tmp_path / "c.jsonl").write_text('{"imdb_id": "tt3", "tmdb_id": 3, "media_type": "movie"}\n')
+
+    rows = [r for name in ("a.csv", "b.tsv", "c.jsonl") for r in read_dump(tmp_path / name)]
+    assert rows == [("tt1", "1", "movie"), ("tt2", "2", "tv"), ("tt3", 3, "movie")]
+
+
+def test_missing_index_loads_as_none(tmp_path):
+    assert IMDbIndex.load(tmp_path / "nope.bin") is None
+
+
+@pytest.mark.parametrize("keep", [0, 5, 20, -1])
+def test_damaged_index_raises_value_error(index_path, keep):
+    data = index_path.read_bytes()
+    index_path.write_bytes(data[:keep])
+    with pytest.raises(ValueError):
+        IMDbIndex(index_path)
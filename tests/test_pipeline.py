@@ -0,0 +1,79 @@
+import asyncio
+import random
+
+import pytest
+
+from tmdb_imp.models import LBEvent, ResolveResult, ResolveStatus
+from tmdb_imp.pipeline import run_async, run_staged
+from tmdb_imp.progress import ProgressJournal, on_progress
+
+
+class SlowResolver:
+    # finishes in random order; every 7th film has no TMDB link
+    async def aresolve(self, url):
+        await asyncio.sleep(random.random() / 1000)
+        n = int(url.rstrip("/").rsplit("/", 1)[1])
+        if n % 7 == 0:
+            return ResolveResult(ResolveStatus.NOT_FOUND)
+        return ResolveResult(ResolveStatus.FOUND, n, "movie")
+
+    async def aclose(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingSink:
+    def __init__(self, bulk):
+        self.bulk = bulk
+        self.buffer = []
+        self.written = []
+
+    def batches(self, ev):
+        return self.bulk
+
+    def enqueue(self, ticket, ev):
+        self.buffer.append(ticket)
+        if len(self.buffer) >= 10:
+            return self.drain()
+        return None
+
+    def drain(self):
+        chunk, self.buffer = self.buffer, []
+        return chunk
+
+    async def awrite_chunk(self, chunk):
+        await asyncio.sleep(random.random() / 1000)
+        self.written += [ev.tmdb_id for _, _, ev in chunk]
+        return [(ticket, None) for ticket in chunk]
+
+    async def aapply(self, ev):
+        await asyncio.sleep(random.random() / 1000)
+        self.written.append(ev.tmdb_id)
+        return ["add"]
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    on_progress(lambda *args: None)
+    yield
+    on_progress(None)
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+@pytest.mark.parametrize("runner, options", [
+    (run_async, {"concurrency": 8}),
+    (run_staged, {"resolve_workers": 8, "sink_workers": 3}),
+])
+def test_list_adds_keep_file_order(tmp_path, runner, options, bulk):
+    events = [LBEvent("list", "", f"https://letterboxd.com/film/{n}/", {"position": n}) for n in range(1, 262)]
+    journal = ProgressJournal(tmp_path / "p.jsonl", tmp_path / "p.idx", tmp_path / "e.jsonl")
+    sink = RecordingSink(bulk)
+
+    asyncio.run(runner(events, SlowResolver(), sink, journal=journal, total=len(events), **options))
+
+    assert sink.written == [n for n in range(1, 262) if n % 7]
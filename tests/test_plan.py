@@ -0,0 +1,92 @@
+import pytest
+
+from tmdb_imp import cli
+from tmdb_imp.models import ResolveResult, ResolveStatus
+from tmdb_imp.plan import apply_main, in_shard, parse_shard, plan_main, read_plan
+from tmdb_imp.progress import on_progress
+
+RATINGS = (
+    "Date,Name,Year,Letterboxd URI,Rating\n"
+    "2024-01-01,Alien,1979,https://letterboxd.com/film/f348/,4.5\n"
+    "2024-01-02,Heat,1995,https://letterboxd.com/film/f949/,3\n"
+    "2024-01-03,Lost,2001,https://letterboxd.com/film/f0/,2\n"
+    "2024-01-04,Rated,2001,https://letterboxd.com/film/f603/,4\n"
+)
+
+
+class Resolver:
+    # f0 has no TMDB link; everything else resolves to the number in its slug
+    def resolve(self, url):
+        n = int(url.rstrip("/").rsplit("/f", 1)[1])
+        if not n:
+            return ResolveResult(ResolveStatus.NOT_FOUND)
+        return ResolveResult(ResolveStatus.FOUND, n, "movie")
+
+    def close(self):
+        pass
+
+
+class Client:
+    v4_token = None
+    session_id = "s"
+
+    def __init__(self):
+        self.posts = []
+
+    def get(self, path, **params):
+        if path == "account":
+            return {"id": 7}
+        if path == "account/7/rated/movies":
+            return {"results": [{"id": 603, "rating": 8.0}], "total_pages": 1}
+        return {"results": [], "total_pages": 1}
+
+    def post(self, path, body, **kwargs):
+        self.posts.append((path, body))
+        return {"success": True}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "build_resolver", lambda args, client, **kw: Resolver())
+    on_progress(lambda *args: None)
+    yield tmp_path
+    on_progress(None)
+
+
+def test_plan_then_apply(workdir, monkeypatch):
+    (workdir / "ratings.csv").write_text(RATINGS)
+    monkeypatch.setattr(cli, "tmdb_client", lambda parser, **kw: Client())
+    plan_main(["ratings", "ratings.csv", "-o", "ratings.plan.gz"])
+
+    [(name, mode, meta, events, total)] = read_plan(workdir / "ratings.plan.gz")
+    assert (mode, meta, total) == ("ratings", None, 3)  # f0 is unresolved, so not replayed
+    assert [(ev.tmdb_id, ev.payload["rating"]) for ev in events] == [(348, 9.0), (949, 6.0), (603, 8.0)]
+    assert sum(len(list(read_plan(workdir / "ratings.plan.gz", (i, 3)))[0][3]) for i in range(3)) == 3
+
+    client = Client()
+    monkeypatch.setattr(cli, "tmdb_client", lambda parser, **kw: client)
+    apply_main(["ratings.plan.gz"])
+    # 603 already holds that rating on the account: re-checked and left alone
+    assert client.posts == [("movie/348/rating", {"value": 9.0}), ("movie/949/rating", {"value": 6.0})]
+
+    client.posts.clear()
+    apply_main(["ratings.plan.gz"])
+    assert client.posts == []  # resumed: everything is done
+
+
+def test_shards_split_events_between_workers():
+    from tmdb_imp.models import LBEvent
+
+    events = [LBEvent("rating", "", f"https://letterboxd.com/film/f{n}/", {"rating": 1.0}) for n in range(200)]
+    owners = [[i for i in range(4) if in_shard(ev, (i, 4))] for ev in events]
+    assert all(len(o) == 1 for o in owners)
+    assert {o[0] for o in owners} == {0, 1, 2, 3}
+    assert all(in_shard(ev, (0, 1)) for ev in events)
+
+
+@pytest.mark.parametrize("raw", ["1", "a/b", "4/4", "-1/2"])
+def test_bad_shards_are_rejected(raw):
+    import argparse
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(raw)
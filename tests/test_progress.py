@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from tmdb_imp.models import LBEvent
+from tmdb_imp.pipeline import event_id, legacy_event_id
+from tmdb_imp.progress import ProgressJournal
+
+
+def rating(value=8.0, date="2024-01-01"):
+    return LBEvent("rating", date, "https://letterboxd.com/film/heat/", {"rating": value})
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return ProgressJournal(tmp_path / "progress.jsonl", tmp_path / "progress.idx", tmp_path / "errors.jsonl")
+
+
+def test_event_id_is_stable_and_covers_every_field():
+    ev = rating()
+    assert event_id(ev) == event_id(rating())
+    assert len(event_id(ev)) == 32
+    assert event_id(rating(value=6.0)) != event_id(ev)
+    assert event_id(rating(date="2024-02-01")) != event_id(ev)
+
+
+def test_success_survives_reload(journal):
+    ev = rating()
+    journal.load().record_success(event_id(ev), ev)
+    journal.close()
+
+    again = ProgressJournal(journal.log, journal.index, journal.errors).load()
+    assert again.is_done(event_id(ev), ev)
+    assert not again.is_done(event_id(rating(value=6.0)), rating(value=6.0))
+
+
+def test_legacy_ids_are_honoured(journal):
+    ev = rating()
+    journal.log.write_text(json.dumps({"event_id": legacy_event_id(ev)}) + "\n")
+
+    journal.load()
+    assert event_id(ev) not in journal.done
+    assert journal.is_done(event_id(ev), ev)
+
+
+def test_torn_log_lines_are_ignored(journal):
+    ev = rating()
+    journal.log.write_text(json.dumps({"event_id": event_id(ev)}) + '\n{"event_id": "ab')
+
+    assert journal.load().is_done(event_id(ev), ev)
+
+
+def test_compaction_moves_the_log_into_the_index(journal):
+    events = [rating(value=v) for v in range(1, 6)]
+    journal.load()
+    for ev in events:
+        journal.record_success(event_id(ev), ev)
+    journal.flush()
+    journal.compact()
+
+    assert journal.log.read_text() == ""
+    assert journal.index.stat().st_size == 5 * 16
+    again = ProgressJournal(journal.log, journal.index, journal.errors).load()
+    assert all(again.is_done(event_id(ev), ev) for ev in events)
+
+
+def test_reload_does_not_recount_the_log(journal):
+    ev = rating()
+    journal.load().record_success(event_id(ev), ev)
+    journal.flush()
+
+    journal.load()
+    journal.load()
+    assert journal.log_lines == 1
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import pytest
+
+from tmdb_imp import ratelimit
+from tmdb_imp.config import MAX_RETRY_AFTER
+from tmdb_imp.ratelimit import retry_after
+
+
+def response(value=None):
+    return SimpleNamespace(headers={"Retry-After": value} if value is not None else {})
+
+
+def test_retry_after_seconds():
+    assert retry_after(response("7"), 1) == 7.0
+    assert retry_after(response("-3"), 1) == 0.0
+
+
+def test_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < retry_after(response(format_datetime(when, usegmt=True)), 1) <= 30
+
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert retry_after(response(format_datetime(past, usegmt=True)), 1) == 0.0
+
+
+def test_retry_after_falls_back_to_backoff():
+    assert retry_after(response(), 3) == 8.0
+    assert retry_after(response("soon"), 3) == 8.0
+    assert retry_after(response(), 10) == 60.0
+
+
+def test_retry_after_is_capped():
+    assert retry_after(response("86400"), 1) == MAX_RETRY_AFTER
+    when = datetime.now(timezone.utc) + timedelta(days=1)
+    assert retry_after(response(format_datetime(when, usegmt=True)), 1) == MAX_RETRY_AFTER
+
+
+class Throttled:
+    def __init__(self, status):
+        self.status_code = status
+        self.headers = {"Retry-After": "0"}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_RETRIES", 2)
+    return ratelimit.RateLimiter({"default": (1000.0, 1000.0)})
+
+
+def test_throttled_responses_are_closed_before_the_retry(limiter):
+    sent = [Throttled(429), Throttled(503), Throttled(200)]
+    replies = iter(sent)
+
+    assert limiter.call("https://example.org/", lambda: next(replies)) is sent[2]
+    assert [r.closed for r in sent] == [True, True, False]
+
+
+def test_last_throttled_response_is_returned_open(limiter):
+    sent = [Throttled(429) for _ in range(3)]
+    replies = iter(sent)
+
+    async def send():
+        return next(replies)
+
+    assert asyncio.run(limiter.acall("https://example.org/", send)) is sent[2]
+    assert [r.closed for r in sent] == [True, True, False]
@@ -0,0 +1,46 @@
+import pytest
+
+from tmdb_imp.models import LBEvent, LoginError
+from tmdb_imp.pipeline import run
+from tmdb_imp.progress import ProgressJournal, on_progress
+from tmdb_imp.resolver import LetterboxdResolver
+from tmdb_imp.store import ResolveStore
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    on_progress(lambda *args: None)
+    yield
+    on_progress(None)
+
+
+def failing_login(calls):
+    def connect():
+        calls.append(1)
+        raise EOFError("no terminal")
+    return connect
+
+
+def test_failed_login_is_not_cached_as_a_page_error(tmp_path):
+    store = ResolveStore(tmp_path / "resolve.db", legacy=None)
+    resolver = LetterboxdResolver(None, store, connect=failing_login([]))
+
+    with pytest.raises(LoginError):
+        resolver.resolve("https://letterboxd.com/film/heat-1995/")
+    assert store.get(store.canonical("https://letterboxd.com/film/heat-1995/")) is None
+    store.close()
+
+
+def test_failed_login_stops_the_run(tmp_path):
+    calls = []
+    store = ResolveStore(tmp_path / "resolve.db", legacy=None)
+    resolver = LetterboxdResolver(None, store, connect=failing_login(calls))
+    journal = ProgressJournal(tmp_path / "p.jsonl", tmp_path / "p.idx", tmp_path / "e.jsonl")
+    events = [LBEvent("watched", "2024-01-0%d" % n, f"https://letterboxd.com/film/f{n}/", {}) for n in range(1, 6)]
+
+    with pytest.raises(LoginError):
+        run(events, resolver, None, dry_run=True, journal=journal, total=len(events))
+    assert calls == [1]
+    assert not (tmp_path / "e.jsonl").exists() or not (tmp_path / "e.jsonl").read_text()
+    assert store.dump()[0] == []
+    store.close()
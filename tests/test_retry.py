@@ -0,0 +1,84 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from tmdb_imp.models import LBEvent
+from tmdb_imp.pipeline import event_id
+from tmdb_imp.progress import ProgressJournal, error_record, retryable
+from tmdb_imp.retry import load_failures
+from tmdb_imp.tmdb_client import TMDBClient, TMDBError
+
+
+def journal(tmp_path):
+    return ProgressJournal(tmp_path / "p.jsonl", tmp_path / "p.idx", tmp_path / "e.jsonl").load()
+
+
+def write_log(path, records):
+    path.write_text("".join(json.dumps(rec) + "\n" for rec in records), encoding="utf-8")
+
+
+def test_latest_record_per_event_wins_and_done_events_drop(tmp_path):
+    j = journal(tmp_path)
+    heat = LBEvent("ratings", "2024-01-01", "https://letterboxd.com/film/heat-1995/", {"rating": 4.5})
+    alien = LBEvent("ratings", "2024-01-02", "https://letterboxd.com/film/alien/", {"rating": 5.0})
+    write_log(tmp_path / "e.jsonl", [
+        error_record(heat, "not_found"),
+        error_record(heat, TimeoutError("slow")),
+        error_record(alien, TimeoutError("slow")),
+    ])
+    j.record_success(event_id(alien), alien)
+
+    retry, permanent = load_failures(tmp_path / "e.jsonl", j)
+    assert list(retry) == [event_id(heat)]
+    assert permanent == []
+    j.close()
+
+
+def test_records_without_event_id_are_not_retried(tmp_path):
+    j = journal(tmp_path)
+    legacy = {"kind": "ratings", "lb_url": "https://letterboxd.com/film/heat-1995/",
+              "payload": {"rating": 4.5}, "error": "timed out", "ts": 0}
+    write_log(tmp_path / "e.jsonl", [legacy])
+
+    retry, permanent = load_failures(tmp_path / "e.jsonl", j)
+    assert retry == {}
+    assert permanent == [legacy]
+    j.close()
+
+
+@pytest.mark.parametrize("err, expected", [
+    ("not_found", False),
+    ("timed out", True),
+    (TMDBError("POST", "list/1/items", 401, {}), False),
+    (TMDBError("POST", "movie/1/rating", 422, {}), False),
+    (TMDBError("POST", "movie/1/rating", 429, {}), True),
+    (TMDBError("POST", "movie/1/rating", 503, {}), True),
+    (ValueError("rating out of range"), False),
+    (TimeoutError("slow"), True),
+])
+def test_retryable(err, expected):
+    assert retryable(err) is expected
+
+
+def response(status, body):
+    return SimpleNamespace(status_code=status, ok=status < 400, json=lambda: body, text=json.dumps(body))
+
+
+def test_bulk_write_rejected_as_a_whole_keeps_its_status():
+    client = TMDBClient("key")
+    body = {"success": False, "status_code": 3, "status_message": "Authentication failed"}
+    with pytest.raises(TMDBError) as e:
+        client._result("POST", "list/1/items", response(401, body), "results")
+    assert e.value.status == 401
+    assert not retryable(e.value)
+
+    partial = {"success": False, "results": [{"media_type": "movie", "media_id": 1, "success": False}]}
+    assert client._result("POST", "list/1/items", response(200, partial), "results") == partial
+
+
+def test_write_reporting_failure_raises():
+    client = TMDBClient("key")
+    with pytest.raises(TMDBError):
+        client._result("POST", "movie/1/rating", response(200, {"success": False}), "success")
+    assert client._result("POST", "movie/1/rating", response(201, {"success": True}), "success")
@@ -0,0 +1,51 @@
+import socket
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from tmdb_imp import serve
+
+
+class StubService:
+    args = SimpleNamespace(token=None)
+
+    def submit(self, params, body):
+        raise ValueError("not expected")
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (serve.Handler,), {"service": StubService()})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1e3"])
+def test_bad_content_length_is_rejected(server, length):
+    with socket.create_connection(server, timeout=5) as sock:
+        sock.sendall(
+            f"POST /jobs?mode=ratings HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode()
+        )
+        reply = sock.recv(4096).decode()
+    assert reply.startswith("HTTP/1.1 400")
+    assert "Content-Length" in reply
+
+
+def test_busy_account_jobs_wait_without_holding_a_worker(monkeypatch):
+    monkeypatch.setattr("tmdb_imp.store.ResolveStore", lambda: None)
+    service = serve.Service(SimpleNamespace(), None, {})
+    a1, a2, b1 = (serve.Job("ratings", acc, None) for acc in ("alice", "alice", "bob"))
+
+    assert service._claim(a1)
+    assert not service._claim(a2)  # parked; the worker moves on
+    assert service._claim(b1)
+
+    assert service._next(a1) is a2  # alice's worker runs it next
+    assert service._next(a2) is None
+    assert service._claim(serve.Job("ratings", "alice", None))
+
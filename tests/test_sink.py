@@ -0,0 +1,127 @@
+from collections import Counter
+
+from tmdb_imp.models import LBEvent, LBListMeta
+from tmdb_imp.sink import TMDBSink
+
+
+class StubClient:
+    v4_token = None
+    session_id = "s"
+
+    def __init__(self):
+        self.gets = Counter()
+        self.lists = 0
+
+    def get(self, path, **params):
+        self.gets[path] += 1
+        if path == "account":
+            return {"id": 7}
+        if path.startswith("list/"):
+            return {"items": [{"media_type": "movie", "id": int(path.split("/")[1]) * 100}]}
+        if path == "account/7/rated/movies":
+            return {"results": [{"id": 348, "rating": 9.0}], "total_pages": 1}
+        return {"results": [], "total_pages": 1}
+
+    def post(self, path, body, **kwargs):
+        self.lists += 1
+        return {"success": True, "list_id": self.lists}
+
+
+def meta(name):
+    return LBListMeta("", name, [], f"https://letterboxd.com/me/list/{name}/", "")
+
+
+def test_target_lists_share_one_account_prefetch(tmp_path):
+    client = StubClient()
+    base = TMDBSink(client, meta("a"), prefetch=True,
+                    list_cache=tmp_path / "lists.json", account_file=tmp_path / "account.json")
+    other = base.for_list(meta("b"))
+    third = other.for_list(meta("c"))
+
+    assert other.state.rated == {("movie", 348): 9.0}
+    assert third.state.list_items == {("movie", 300)}
+    assert base.state.list_items == {("movie", 100)}
+    assert client.gets["account/7/rated/movies"] == 1
+    assert [client.gets[f"list/{n}"] for n in (1, 2, 3)] == [1, 1, 1]
+
+    # a write through one list's sink shows up in the account sets of the others
+    other.state.mark(LBEvent("rating", "", "", {"rating": 4.0}, 603, "movie"))
+    assert third.state.rated[("movie", 603)] == 4.0
+
+
+# ---- bulk list adds ----
+class BulkClient(StubClient):
+    v4_token = "token"
+
+    def __init__(self, reply):
+        super().__init__()
+        self.reply = reply
+        self.posts = []
+
+    def post(self, path, body, v4=False, check=True):
+        if path == "list":
+            return super().post(path, body)
+        self.posts.append((path, body, v4))
+        return self.reply(path, body) if v4 else {"success": True}
+
+
+def bulk_sink(tmp_path, reply, batch_size=3):
+    return TMDBSink(BulkClient(reply), meta("a"), batch_size=batch_size,
+                    list_cache=tmp_path / "lists.json", account_file=tmp_path / "account.json")
+
+
+def film(n, rating=None, media_type="movie"):
+    return LBEvent("list", "", f"https://letterboxd.com/film/f{n}/",
+                   {"position": n, "rating": rating}, tmdb_id=n, media_type=media_type)
+
+
+def test_adds_are_sent_in_chunks(tmp_path):
+    sink = bulk_sink(tmp_path, lambda path, body: {
+        "success": True, "results": [dict(i, success=True) for i in body["items"]],
+    })
+    events = [film(n) for n in range(1, 5)]
+
+    assert all(sink.batches(ev) for ev in events)
+    chunks = [sink.enqueue((n, ev), ev) for n, ev in enumerate(events)]
+    assert chunks[:2] == [None, None]
+    assert chunks[2] == [((n, events[n]), events[n]) for n in range(3)]
+    assert sink.drain() == [((3, events[3]), events[3])]
+
+    results = sink.write_chunk(chunks[2])
+    assert results == [((n, events[n]), None) for n in range(3)]
+    path, body, v4 = sink.client.posts[0]
+    assert (path, v4) == ("list/1/items", True)
+    assert body == {"items": [{"media_type": "movie", "media_id": n} for n in (1, 2, 3)]}
+
+
+def test_results_map_back_to_their_events(tmp_path):
+    def reply(path, body):
+        return {"success": False, "results": [
+            {"media_type": "movie", "media_id": 1, "success": True},
+            {"media_type": "movie", "media_id": 2, "success": False, "error": ["Media has already been taken."]},
+            {"media_type": "movie", "media_id": 3, "success": False, "error": ["Invalid id."]},
+            # 4 is not reported at all
+        ]}
+
+    sink = bulk_sink(tmp_path, reply, batch_size=10)
+    events = [film(1), film(2, rating=8.0), film(3), film(4)]
+    chunk = [((n, ev), ev) for n, ev in enumerate(events)]
+
+    errors = {ticket[0]: err for ticket, err in sink.write_chunk(chunk)}
+    assert errors[0] is None and errors[1] is None  # "already taken": the item is on the list
+    assert isinstance(errors[2], ValueError)
+    assert isinstance(errors[3], RuntimeError) and "did not report" in str(errors[3])
+    # the rating of an item the bulk call added is still written, one by one
+    assert ("movie/2/rating", {"value": 8.0}, False) in sink.client.posts
+
+
+def test_a_failed_bulk_call_fails_its_whole_chunk(tmp_path):
+    from tmdb_imp.tmdb_client import TMDBError
+
+    def reply(path, body):
+        raise TMDBError("POST", path, 401, {"success": False})
+
+    sink = bulk_sink(tmp_path, reply)
+    chunk = [((n, film(n)), film(n)) for n in (1, 2)]
+    results = sink.write_chunk(chunk)
+    assert [err.status for _, err in results] == [401, 401]
@@ -0,0 +1,61 @@
+import gzip
+import json
+
+import pytest
+
+from tmdb_imp.snapshot import export_snapshot, import_snapshot
+from tmdb_imp.store import ResolveStore
+
+
+@pytest.fixture
+def source(tmp_path):
+    store = ResolveStore(tmp_path / "source.db", legacy=None)
+    store.put("https://letterboxd.com/film/alien/", "found", 348, "movie")
+    store.put("tt0000001", "not_found")
+    store.fail("https://letterboxd.com/film/flaky/")
+    store.alias("https://boxd.it/2b0k", "https://letterboxd.com/film/alien/")
+    lists = tmp_path / "source_lists.json"
+    lists.write_text(json.dumps({"https://letterboxd.com/me/list/faves/": 11}))
+
+    path = tmp_path / "snap.jsonl.gz"
+    counts = export_snapshot(store, path, list_cache=lists)
+    store.close()
+    assert counts == {"resolutions": 2, "aliases": 1, "lists": 1}  # the failure stays home
+    return path
+
+
+def test_import_is_a_merge_and_idempotent(tmp_path, source):
+    store = ResolveStore(tmp_path / "worker.db", legacy=None)
+    lists = tmp_path / "worker_lists.json"
+    lists.write_text(json.dumps({"https://letterboxd.com/me/list/faves/": 99}))
+
+    assert import_snapshot(store, source, list_cache=lists) == {"resolutions": 2, "aliases": 1, "lists": 0}
+    assert store.get("https://letterboxd.com/film/alien/")["tmdb_id"] == 348
+    assert store.canonical("https://boxd.it/2b0k") == "https://letterboxd.com/film/alien/"
+    assert store.get("https://letterboxd.com/film/flaky/") is None
+    assert json.loads(lists.read_text()) == {"https://letterboxd.com/me/list/faves/": 99}
+
+    rows = store.dump()
+    assert import_snapshot(store, source, list_cache=lists) == {"resolutions": 0, "aliases": 0, "lists": 0}
+    assert store.dump() == rows
+    store.close()
+
+
+def test_newer_local_answers_win(tmp_path, source):
+    store = ResolveStore(tmp_path / "worker.db", legacy=None)
+    store.put("tt0000001", "found", 5, "tv")  # fresher than the snapshot's not_found
+
+    import_snapshot(store, source, list_cache=tmp_path / "lists.json")
+    assert store.get("tt0000001")["status"] == "found"
+    store.close()
+
+
+def test_rejects_other_files_and_newer_versions(tmp_path):
+    store = ResolveStore(tmp_path / "worker.db", legacy=None)
+    for header in ({"format": "something-else"}, {"format": "tmdb-imp-cache", "version": 99}):
+        path = tmp_path / "bad.gz"
+        with gzip.open(path, "wt") as f:
+            f.write(json.dumps(header) + "\n")
+        with pytest.raises(ValueError):
+            import_snapshot(store, path, list_cache=tmp_path / "lists.json")
+    store.close()
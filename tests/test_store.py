@@ -0,0 +1,146 @@
+import json
+import time
+
+from tmdb_imp.store import ResolveStore
+
+
+def open_store(tmp_path, name="resolve.db"):
+    return ResolveStore(tmp_path / name, legacy=None)
+
+
+def test_snapshot_answer_replaces_a_newer_local_failure(tmp_path):
+    store = open_store(tmp_path)
+    store.fail("https://letterboxd.com/film/heat-1995/")
+    old = time.time() - 3600
+
+    merged, _ = store.merge([("https://letterboxd.com/film/heat-1995/", "found", 949, "movie", old)], [])
+    row = store.get("https://letterboxd.com/film/heat-1995/")
+    assert merged == 1
+    assert (row["status"], row["tmdb_id"], row["fails"], row["next_try"]) == ("found", 949, 0, None)
+    store.close()
+
+
+def test_answers_survive_a_reopen(tmp_path):
+    store = open_store(tmp_path)
+    store.put("https://letterboxd.com/film/alien/", "found", 348, "movie")
+    store.put("tt0000001", "not_found")
+    store.alias("https://boxd.it/2b0k", "https://letterboxd.com/film/alien/")
+    store.close()
+
+    store = open_store(tmp_path)
+    assert len(store) == 2
+    row = store.get("https://letterboxd.com/film/alien/")
+    assert (row["status"], row["tmdb_id"], row["media_type"]) == ("found", 348, "movie")
+    assert store.get("tt0000001")["tmdb_id"] is None
+    assert store.get("tt0000002") is None
+    assert store.canonical("https://boxd.it/2b0k") == "https://letterboxd.com/film/alien/"
+    assert store.canonical("https://boxd.it/other") == "https://boxd.it/other"
+    store.close()
+
+
+def test_legacy_json_cache_is_migrated_once(tmp_path):
+    legacy = tmp_path / "resolve_cache.json"
+    legacy.write_text(json.dumps({
+        "https://letterboxd.com/film/alien/": {"status": "found", "tmdb_id": 348, "media_type": "movie", "ts": 5.0},
+        "https://letterboxd.com/film/gone/": {"status": "not_found"},
+        "junk": "not a record",
+        "no-status": {"tmdb_id": 1},
+    }))
+
+    store = ResolveStore(tmp_path / "resolve.db", legacy=legacy)
+    assert len(store) == 2
+    row = store.get("https://letterboxd.com/film/alien/")
+    assert (row["status"], row["tmdb_id"], row["ts"]) == ("found", 348, 5.0)
+    assert store.get("https://letterboxd.com/film/gone/")["ts"] == 0.0
+    assert not legacy.exists()
+    assert legacy.with_suffix(".json.migrated").exists()
+    store.close()
+
+
+def test_legacy_rows_do_not_override_the_database(tmp_path):
+    store = open_store(tmp_path)
+    store.put("https://letterboxd.com/film/alien/", "found", 348, "movie")
+    store.close()
+
+    legacy = tmp_path / "resolve_cache.json"
+    legacy.write_text(json.dumps({"https://letterboxd.com/film/alien/": {"status": "not_found", "ts": 1.0}}))
+    store = ResolveStore(tmp_path / "resolve.db", legacy=legacy)
+    assert store.get("https://letterboxd.com/film/alien/")["status"] == "found"
+    store.close()
+
+
+def test_unreadable_legacy_cache_is_left_alone(tmp_path):
+    legacy = tmp_path / "resolve_cache.json"
+    legacy.write_text("{not json")
+    store = ResolveStore(tmp_path / "resolve.db", legacy=legacy)
+    assert len(store) == 0
+    assert legacy.exists()
+    store.close()
+
+
+# ---- TTLs and error backoff ----
+def test_freshness_by_status_and_backoff():
+    from tmdb_imp.store import is_fresh
+
+    now = 1_000_000_000.0
+    ttl = {"found": 100, "not_found": 10}
+    row = lambda status, age, next_try=None: {"status": status, "ts": now - age, "next_try": next_try}
+
+    assert is_fresh(row("found", 99), now, ttl)
+    assert not is_fresh(row("found", 100), now, ttl)
+    assert not is_fresh(row("not_found", 11), now, ttl)
+    assert is_fresh(row("blocked", 10 ** 6), now, ttl)  # no TTL: trusted for good
+    assert not is_fresh(row("error", 0), now, ttl)
+    assert is_fresh(row("error", 0, next_try=now + 1), now, ttl)
+    assert is_fresh(row("found", 1000, next_try=now + 1), now, ttl)  # stale, but backing off
+
+
+def test_failures_back_off_exponentially_up_to_the_cap(tmp_path):
+    store = open_store(tmp_path)
+    key = "https://letterboxd.com/film/flaky/"
+
+    waits = []
+    for _ in range(5):
+        before = time.time()
+        waits.append(round(store.fail(key, base=10, cap=50) - before))
+    assert waits == [10, 20, 40, 50, 50]
+    assert store.get(key)["fails"] == 5
+
+    store.clear_backoff(key)
+    row = store.get(key)
+    assert row["next_try"] is None and row["fails"] == 5
+    store.close()
+
+
+def test_a_failure_keeps_the_earlier_answer(tmp_path):
+    store = open_store(tmp_path)
+    key = "https://letterboxd.com/film/alien/"
+    store.put(key, "found", 348, "movie")
+    store.fail(key)
+
+    row = store.get(key)
+    assert (row["status"], row["tmdb_id"], row["fails"]) == ("found", 348, 1)
+    store.put(key, "found", 348, "movie")  # a successful refetch resets the count
+    assert store.get(key)["fails"] == 0
+    store.close()
+
+
+def test_prune_evicts_stale_rows_but_not_backoffs(tmp_path):
+    store = open_store(tmp_path)
+    store.put("old", "not_found")
+    store.put("new", "found", 1, "movie")
+    store.fail("flaky")
+    store.alias("short", "old")
+    store.db.execute("UPDATE resolutions SET ts = ts - 1000 WHERE key IN ('old', 'flaky')")
+
+    ttl = {"found": 100, "not_found": 100, "error": 100}
+    assert store.prune(ttl, dry_run=True) == {"not_found": 1}
+    assert len(store) == 3
+    assert store.prune(ttl) == {"not_found": 1}
+    assert store.get("old") is None and store.get("flaky") is not None
+    assert store.canonical("short") == "short"
+
+    stats = store.stats(ttl)
+    assert stats["rows"] == 2 and stats["aliases"] == 0
+    assert stats["by_status"]["error"]["backing_off"] == 1
+    store.close()
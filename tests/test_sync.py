@@ -0,0 +1,40 @@
+from tmdb_imp.sync import Fingerprint
+
+
+def row(film, rating="4"):
+    return {"Date": "2024-01-01", "Name": film, "Letterboxd URI": f"https://boxd.it/{film}", "Rating": rating}
+
+
+def test_first_run_imports_everything(tmp_path):
+    fp = Fingerprint("ratings", None, tmp_path).diff([row("a"), row("b")])
+    assert fp.counts == {"new": 2, "changed": 0, "unchanged": 0, "removed": 0}
+    assert list(fp.rows()) == [row("a"), row("b")]
+
+
+def test_next_run_sees_only_the_delta(tmp_path):
+    first = Fingerprint("ratings", None, tmp_path).diff([row("a"), row("b"), row("c")])
+    first.save([True, True, True])
+
+    fp = Fingerprint("ratings", None, tmp_path).diff([row("a"), row("b", "5"), row("d")])
+    assert fp.counts == {"new": 1, "changed": 1, "unchanged": 1, "removed": 1}
+    assert list(fp.rows()) == [row("b", "5"), row("d")]
+
+
+def test_failed_rows_come_back(tmp_path):
+    Fingerprint("ratings", None, tmp_path).diff([row("a"), row("b")]).save([True, False])
+
+    fp = Fingerprint("ratings", None, tmp_path).diff([row("a"), row("b")])
+    assert list(fp.rows()) == [row("b")]
+
+
+def test_full_ignores_the_fingerprint(tmp_path):
+    Fingerprint("ratings", None, tmp_path).diff([row("a")]).save([True])
+
+    fp = Fingerprint("ratings", None, tmp_path).diff([row("a")], full=True)
+    assert fp.counts["new"] == 1
+
+
+def test_streams_are_fingerprinted_separately(tmp_path):
+    Fingerprint("ratings", None, tmp_path).diff([row("a")]).save([True])
+
+    assert Fingerprint("watchlist", None, tmp_path).diff([row("a")]).counts["new"] == 1
@@ -0,0 +1,35 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from tmdb_imp import tmdb_client
+from tmdb_imp.ratelimit import RateLimiter
+from tmdb_imp.tmdb_client import TMDBClient
+
+
+class Session:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+
+    def request(self, method, url, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        return SimpleNamespace(status_code=200, ok=True, json=lambda: {"id": 1}, text="")
+
+
+def test_sync_requests_are_held_to_the_pool_size(monkeypatch):
+    session = Session()
+    monkeypatch.setattr(tmdb_client, "shared_session", lambda: session)
+    monkeypatch.setattr(tmdb_client, "_sync_slots", threading.BoundedSemaphore(3))
+    monkeypatch.setattr(tmdb_client, "limiter", RateLimiter({"default": (1000.0, 1000.0)}))
+
+    client = TMDBClient("key")
+    with ThreadPoolExecutor(12) as pool:
+        assert list(pool.map(lambda n: client.get(f"movie/{n}"), range(36))) == [{"id": 1}] * 36
+    assert session.peak == 3
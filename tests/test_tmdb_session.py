@@ -0,0 +1,39 @@
+import json
+
+from tmdb_imp.tmdb_session import ensure_account_id
+
+
+class Client:
+    def __init__(self, session_id, account_id=7):
+        self.session_id = session_id
+        self.account_id = account_id
+        self.calls = 0
+
+    def get(self, path):
+        assert path == "account"
+        self.calls += 1
+        return {"id": self.account_id}
+
+
+def test_account_id_is_cached_without_the_session_id(tmp_path):
+    path = tmp_path / "tmdb_account.json"
+    client = Client("secret-session")
+
+    assert ensure_account_id(client, path) == 7
+    assert ensure_account_id(client, path) == 7
+    assert client.calls == 1
+    assert "secret-session" not in path.read_text()
+
+    other = Client("another-session", account_id=9)
+    assert ensure_account_id(other, path) == 9
+    assert other.calls == 1
+
+
+def test_plaintext_files_are_rewritten(tmp_path):
+    path = tmp_path / "tmdb_account.json"
+    path.write_text(json.dumps({"session_id": "secret-session", "id": 7}))
+    client = Client("secret-session")
+
+    assert ensure_account_id(client, path) == 7
+    assert client.calls == 0
+    assert "secret-session" not in path.read_text()